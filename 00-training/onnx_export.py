@@ -17,6 +17,8 @@ parser = argparse.ArgumentParser()
 parser.add_argument('--input', type=str, default='model_best.pth.tar', help="path to input PyTorch model (default: model_best.pth.tar)")
 parser.add_argument('--output', type=str, default='', help="desired path of converted ONNX model (default: <ARCH>.onnx)")
 parser.add_argument('--model-dir', type=str, default='', help="directory to look for the input PyTorch model in, and export the converted ONNX model to (if --output doesn't specify a directory)")
+parser.add_argument('--batch-size', type=int, default=1, help="batch size of the example input used for tracing (default: 1)")
+parser.add_argument('--dynamic-batch', action='store_true', help="export the batch dimension as dynamic, so the vision servers can run all crops in one pass")
 parser.add_argument('--no-activation', type=bool, default=False, help="disable adding Softmax or Sigmoid layer to model (default is to add it)")
 
 args = parser.parse_args() 
@@ -62,8 +64,8 @@ print(model)
 
 # create example image data
 resolution = checkpoint['resolution']
-input = torch.ones((1, 3, resolution, resolution)).cuda()
-print('=> input size:  {:d}x{:d}'.format(resolution, resolution))
+input = torch.ones((args.batch_size, 3, resolution, resolution)).to(device)
+print('=> input size:  {:d}x{:d} (batch {:d})'.format(resolution, resolution, args.batch_size))
 
 # format output model path
 if not args.output:
@@ -76,8 +78,13 @@ if args.model_dir and args.output.find('/') == -1 and args.output.find('\\') ==
 input_names = [ "input_0" ]
 output_names = [ "output_0" ]
 
+dynamic_axes = None
+if args.dynamic_batch:
+    dynamic_axes = {name: {0: 'batch'} for name in input_names + output_names}
+    print('=> exporting with a dynamic batch dimension')
+
 print('=> exporting model to ONNX...')
-torch.onnx.export(model, input, args.output, verbose=True, input_names=input_names, output_names=output_names)
+torch.onnx.export(model, input, args.output, verbose=True, input_names=input_names, output_names=output_names, dynamic_axes=dynamic_axes)
 print('=> model exported to:  {:s}'.format(args.output))
 
 
@@ -1,15 +1,19 @@
+import os
+import sys
+
 import onnxruntime as ort
-import torch
 import torchvision.transforms as transforms
-import numpy as np
 from PIL import Image
 
+# Shared helpers live next to the Jetson servers
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "02-jetson"))
+from ort_engine import OrtEngine
+
 # =======================
 # CONFIGURATION
 # =======================
 MODEL_NAME = "mobilenet_v2"
 IMAGE_PATH = "../data/cible/Image_2025_0005_10_cible.jpg"
-NUM_CLASSES = 2
 # =======================
 ONNX_MODEL_PATH = f"../models/{MODEL_NAME}/{MODEL_NAME}.onnx"
 # =======================
@@ -22,49 +26,21 @@ def default_transform(resolution=(224,224)):
         transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),  # Normalize the colors
     ])
 
-providers = ["CUDAExecutionProvider"]
-
-# create ONNX session using CUDA
-ort_sess = ort.InferenceSession(ONNX_MODEL_PATH, providers = providers)
+# ONNX Runtime engine of the vision server: session, IOBinding and buffers are created once
+# per input shape, on the GPU when onnxruntime-gpu is installed, else on the CPU
+device = "cuda" if "CUDAExecutionProvider" in ort.get_available_providers() else "cpu"
+engine = OrtEngine(ONNX_MODEL_PATH, device)
 
 # Load image
 image = Image.open(IMAGE_PATH)
 # adapt the image to make it compatible with the model input
 transform = default_transform()
-# transform image into tensor
-input_tensor = transform(image)
-# change shape of tensor and transfer it to the device
-input_tensor = input_tensor.unsqueeze(0).to("cuda:0")
-
-
-io_binding = ort_sess.io_binding()
-# bind input_tensor to the model
-io_binding.bind_input(
-    name = "input_0",
-    device_type = "cuda",
-    device_id = 0,
-    element_type = np.float32,
-    shape = tuple(input_tensor.shape),
-    buffer_ptr = input_tensor.data_ptr()
-)
-
-# create a tensor for the output on the device
-output_tensor = torch.empty((1, NUM_CLASSES), dtype = torch.float32, device =
-"cuda:0").contiguous()
-# bind the output to the model
-io_binding.bind_output(
-    name = "output_0",
-    device_type = "cuda",
-    device_id = 0,
-    element_type = np.float32,
-    shape = tuple(output_tensor.shape),
-    buffer_ptr = output_tensor.data_ptr()
-)
-
-ort_sess.run_with_iobinding(io_binding)
+# transform image into a [1,3,224,224] float32 batch, written into the bound input buffer
+input_batch = engine.allocate((1, 3, 224, 224))
+input_batch.array[0] = transform(image).numpy()
 
-# Get probabilities from output tensor
-probas = output_tensor.to("cpu")[0].tolist()
+# Get probabilities from the bound output buffer
+probas = engine.infer(input_batch.array)[0].tolist()
 
 # check probability sum is almost 1
 assert abs(1 - sum(probas)) < 0.0001
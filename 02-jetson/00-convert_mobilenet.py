@@ -11,6 +11,8 @@ import tensorrt as trt
 INPUT_MODEL = "../models/mobilenet_v2.pth.tar"
 OUTPUT_TRT = "../models/mobilenet_v2_trt.pth"
 NUM_CLASSES = 2
+# The vision servers run the left/center/right crops as one batch
+MAX_BATCH_SIZE = 3
 DEVICE = torch.device('cuda')
 
 @tensorrt_converter('torch.nn.functional.hardtanh')
@@ -53,7 +55,7 @@ start = time.time()
 
 # --- MAGIC HAPPENS HERE ---
 # fp16_mode=True doubles performance on Jetson Nano (Maxwell GPU)
-model_trt = torch2trt(model, [x], fp16_mode=True)
+model_trt = torch2trt(model, [x], fp16_mode=True, max_batch_size=MAX_BATCH_SIZE)
 
 end = time.time()
 print(f"[Success] Conversion done in {end - start:.2f} seconds.")
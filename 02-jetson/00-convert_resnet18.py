@@ -8,6 +8,8 @@ import time
 INPUT_MODEL = "../models/resnet18.pth.tar"
 OUTPUT_TRT = "../models/resnet18_trt.pth"
 NUM_CLASSES = 2
+# The vision servers run the left/center/right crops as one batch
+MAX_BATCH_SIZE = 3
 DEVICE = torch.device('cuda')
 
 print(f"[Init] Loading PyTorch model from {INPUT_MODEL}...")
@@ -36,7 +38,7 @@ start = time.time()
 
 # --- MAGIC HAPPENS HERE ---
 # fp16_mode=True doubles performance on Jetson Nano (Maxwell GPU)
-model_trt = torch2trt(model, [x], fp16_mode=True)
+model_trt = torch2trt(model, [x], fp16_mode=True, max_batch_size=MAX_BATCH_SIZE)
 
 end = time.time()
 print(f"[Success] Conversion done in {end - start:.2f} seconds.")
@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# Vision server: backend, model, input and crop layout are chosen on the command line
+# e.g. python3 01-vision_server.py --backend trt --model ../models/mobilenet_v2_b16_lr0.001_e40_trt.pth
+#      python3 01-vision_server.py --backend onnx --model ../models/mobilenet_v2/mobilenet_v2.onnx --input demo-direction.mp4
+import server
+
+if __name__ == "__main__":
+    server.main()
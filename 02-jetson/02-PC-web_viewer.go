@@ -2,15 +2,18 @@ package main
 
 import (
 	"encoding/base64"
+	"encoding/binary"
 	"encoding/json"
 	"fmt"
 	"image"
 	"image/color"
 	"io/ioutil"
 	"log"
+	"math"
 	"net/http"
 	"os"
 	"path/filepath"
+	"strings"
 	"sync"
 	"time"
 
@@ -29,7 +32,11 @@ const (
 	CropSize     = 224
 	OffsetLeft   = 0
 	OffsetCenter = 48
-	OffsetRight  = 95
+	OffsetRight  = 96
+	// Topic of the messages carrying an image (the control topic has none)
+	PreviewTopic = "prev"
+	// Stream to display with a multi-stream server ("0", "1"...), "" otherwise
+	Stream = ""
 )
 
 // --- GLOBAL STATE ---
@@ -52,6 +59,103 @@ type VisionData struct {
 	Probs    map[string]float64 `json:"probs"` // "left", "center", "right"
 	ImageB64 string             `json:"image_b64"`
 	FPS      float64            `json:"jetson_fps"`
+	Seq      uint32             `json:"seq"`
+	Offsets  map[string]int     `json:"-"` // Crop x offsets sent in the binary header
+	CropSize int                `json:"-"` // Crop width sent in the binary header
+}
+
+// --- BINARY PROTOCOL (see wire.py) ---
+// Multipart message: [header][jpeg]
+// header: magic "VS", version u8, flags u8, seq u32, capture_ts f64, publish_ts f64,
+// fps f32, crop_size u16, n_crops u16, n x prob f32, n x crop x u16
+const (
+	ProtocolVersion = 1
+	FlagImage       = 0x01
+	HeaderSize      = 32
+)
+
+var zoneNames = []string{"left", "center", "right"}
+
+func zoneName(i, n int) string {
+	if n == len(zoneNames) {
+		return zoneNames[i]
+	}
+	return fmt.Sprintf("crop%d", i)
+}
+
+// decodeBinary parses a binary message into VisionData and the raw JPEG bytes (nil if absent)
+func decodeBinary(parts [][]byte) (VisionData, []byte, error) {
+	var data VisionData
+	header := parts[0]
+	if len(header) < HeaderSize || header[0] != 'V' || header[1] != 'S' {
+		return data, nil, fmt.Errorf("not a vision server message")
+	}
+	if header[2] != ProtocolVersion {
+		return data, nil, fmt.Errorf("unsupported protocol version %d", header[2])
+	}
+	flags := header[3]
+	data.Seq = binary.LittleEndian.Uint32(header[4:8])
+	data.FPS = float64(math.Float32frombits(binary.LittleEndian.Uint32(header[24:28])))
+	data.CropSize = int(binary.LittleEndian.Uint16(header[28:30]))
+	n := int(binary.LittleEndian.Uint16(header[30:32]))
+	if len(header) < HeaderSize+6*n {
+		return data, nil, fmt.Errorf("truncated header")
+	}
+
+	data.Probs = make(map[string]float64, n)
+	data.Offsets = make(map[string]int, n)
+	for i := 0; i < n; i++ {
+		p := HeaderSize + 4*i
+		x := HeaderSize + 4*n + 2*i
+		name := zoneName(i, n)
+		data.Probs[name] = float64(math.Float32frombits(binary.LittleEndian.Uint32(header[p : p+4])))
+		data.Offsets[name] = int(binary.LittleEndian.Uint16(header[x : x+2]))
+	}
+
+	if flags&FlagImage == 0 || len(parts) < 2 {
+		return data, nil, nil
+	}
+	return data, parts[1], nil
+}
+
+// drawHeatmap draws one colored cell per window, centered on the window, from grey (0) to green (1)
+func drawHeatmap(img *gocv.Mat, data VisionData) {
+	n := len(data.Probs)
+	minX, maxX := CamWidth, 0
+	for _, x := range data.Offsets {
+		minX = int(math.Min(float64(minX), float64(x)))
+		maxX = int(math.Max(float64(maxX), float64(x)))
+	}
+	cell := data.CropSize
+	if n > 1 {
+		cell = int(math.Max(2, float64(maxX-minX)/float64(n-1)))
+	}
+	for zone, prob := range data.Probs {
+		center := data.Offsets[zone] + data.CropSize/2
+		col := color.RGBA{uint8(100 * (1 - prob)), uint8(100 + 155*prob), uint8(100 * (1 - prob)), 0}
+		rect := image.Rect(center-cell/2, CamHeight-12, center+cell/2, CamHeight)
+		gocv.Rectangle(img, rect, col, -1)
+	}
+}
+
+// decodeMessage accepts both the binary protocol and the legacy base64-in-JSON payload
+func decodeMessage(parts [][]byte) (VisionData, []byte, error) {
+	if len(parts) > 1 && strings.HasPrefix(string(parts[0]), PreviewTopic) {
+		parts = parts[1:]
+	}
+	if len(parts) == 0 || len(parts[0]) == 0 {
+		return VisionData{}, nil, fmt.Errorf("empty message")
+	}
+	if parts[0][0] != '{' {
+		return decodeBinary(parts)
+	}
+
+	var data VisionData
+	if err := json.Unmarshal(parts[0], &data); err != nil {
+		return data, nil, err
+	}
+	rawBytes, err := base64.StdEncoding.DecodeString(data.ImageB64)
+	return data, rawBytes, err
 }
 
 // HTML Interface
@@ -192,8 +296,16 @@ func zmqLoop() {
 	addr := fmt.Sprintf("tcp://%s:%s", JetsonIP, ZmqPort)
 	fmt.Printf("[Connect] Connecting to %s...\n", addr)
 	socket.Connect(addr)
-	socket.SetSubscribe("")
-	socket.SetConflate(true)
+	// Preview images only, plus the legacy JSON messages (they start with '{')
+	topic := PreviewTopic
+	if Stream != "" {
+		topic = PreviewTopic + "/" + Stream
+	}
+	socket.SetSubscribe(topic)
+	socket.SetSubscribe("{")
+	// Conflate does not support multipart messages: keep only a couple of
+	// frames in the queue instead so the viewer stays close to real time
+	socket.SetRcvhwm(2)
 
 	var writer *gocv.VideoWriter
 	var recordingStartTime time.Time
@@ -239,19 +351,17 @@ func zmqLoop() {
 		default:
 		}
 
-		msg, err := socket.Recv(0)
-		if err != nil {
+		parts, err := socket.RecvMessageBytes(0)
+		if err != nil || len(parts) == 0 {
 			continue
 		}
-
-		var data VisionData
-		if err := json.Unmarshal([]byte(msg), &data); err != nil {
+		// ZMQ matches topic prefixes: "prev" also receives "prev/0", "prev/1"...
+		if len(parts[0]) > 0 && parts[0][0] != '{' && string(parts[0]) != topic {
 			continue
 		}
 
-		// Decode Base64
-		rawBytes, err := base64.StdEncoding.DecodeString(data.ImageB64)
-		if err != nil {
+		data, rawBytes, err := decodeMessage(parts)
+		if err != nil || rawBytes == nil {
 			continue
 		}
 
@@ -277,8 +387,19 @@ func zmqLoop() {
 		// Draw Top Bar Background
 		gocv.Rectangle(&img, image.Rect(0, 0, CamWidth, 20), rectCol, -1)
 
+		// More than 3 windows: draw the 1-D heatmap of the windows along the bottom
+		if len(data.Probs) > len(zoneNames) {
+			drawHeatmap(&img, data)
+		}
+
 		for zone, prob := range data.Probs {
+			if len(data.Probs) > len(zoneNames) {
+				break
+			}
 			xStart := offsets[zone]
+			if data.Offsets != nil {
+				xStart = data.Offsets[zone]
+			}
 
 			// Color: Green if detected, Grey otherwise
 			var rectCol color.RGBA
@@ -2,9 +2,14 @@ import zmq
 from jetracer.nvidia_racecar import NvidiaRacecar
 import signal
 import sys
+import time
+
+import wire
+from metrics import MetricsRegistry, serve_http, rate
 
 # --- CONFIG ---
 ZMQ_PORT = 5555
+STREAM = None  # stream of a multi-stream server ("0", "1"...), None for a single-stream server
 
 # Probabilities thresholds
 THRESHOLD_TARGET = 0.60
@@ -18,6 +23,10 @@ STEER_STRAIGHT = 0.0
 STEER_SOFT = 0.3
 STEER_HARD = 0.6
 
+# Metrics
+METRICS_PORT = 9102  # Prometheus metrics on http://<jetson>:9102/metrics, 0 = off
+STALE_AGE = 0.2      # seconds between capture and reception above which a message is stale
+
 # Setup Car
 car = NvidiaRacecar()
 
@@ -34,14 +43,27 @@ def main():
     context = zmq.Context()
     socket = context.socket(zmq.SUB)
     socket.connect(f"tcp://127.0.0.1:{ZMQ_PORT}")
-    socket.setsockopt_string(zmq.SUBSCRIBE, "") # Subscribe to all topics
+    wire.subscribe(socket, wire.TOPIC_CONTROL, STREAM) # Probabilities only, no preview images
+
+    # Prometheus metrics: one integer add per message in the loop
+    registry = MetricsRegistry()
+    received = registry.counter("controller_messages_received_total", "Vision messages received")
+    stale = registry.counter("controller_stale_messages_total", f"Messages older than {STALE_AGE}s when received")
+    decisions = registry.counter("controller_decisions_total", "Commands sent to the car")
+    registry.gauge("controller_decision_rate", "Commands per second since the previous scrape", fn=rate(decisions))
+    if METRICS_PORT:
+        serve_http(registry, METRICS_PORT)
 
     print("[Control] Controller connected. Waiting for Vision data...")
 
     while True:
         # 1. Receive prediction data
-        data = socket.recv_json()
-        probs = data['probs']
+        data = wire.recv(socket, with_image=False, stream=STREAM) # binary or legacy JSON messages, this stream only
+        received.inc()
+        capture_ts = data.get('capture_ts') # missing in the JSON payloads of older servers
+        if capture_ts is not None and time.time() - capture_ts > STALE_AGE:
+            stale.inc()
+        probs = data['zones'] # left / center / right, whatever the server's window layout
 
         # Extract probabilities
         p_left = probs['left']
@@ -87,6 +109,7 @@ def main():
         else:
             car.throttle = 0.0
             car.steering = STEER_STRAIGHT
+        decisions.inc()
 
 if __name__ == "__main__":
     main()
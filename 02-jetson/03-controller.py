@@ -2,12 +2,19 @@ import zmq
 from jetracer.nvidia_racecar import NvidiaRacecar
 import signal
 import sys
+import time
+
+import wire
+from metrics import MetricsRegistry, serve_http, rate
 
 # --- CONFIG ---
 ZMQ_PORT = 5555
+STREAM = None  # stream of a multi-stream server ("0", "1"...), None for a single-stream server
 THRESHOLD_CIBLE = 0.70
 THRESHOLD_NOCIBLE = 0.40
 SPEED_NORMAL = 0.14
+METRICS_PORT = 9102  # Prometheus metrics on http://<jetson>:9102/metrics, 0 = off
+STALE_AGE = 0.2      # seconds between capture and reception above which a message is stale
 
 # Setup Car
 car = NvidiaRacecar()
@@ -24,23 +31,38 @@ def main():
     context = zmq.Context()
     socket = context.socket(zmq.SUB)
     socket.connect(f"tcp://127.0.0.1:{ZMQ_PORT}")
-    socket.setsockopt_string(zmq.SUBSCRIBE, "") # Subscribe to all topic
+    wire.subscribe(socket, wire.TOPIC_CONTROL, STREAM) # Probabilities only, no preview images
+
+    # Prometheus metrics: one integer add per message in the loop
+    registry = MetricsRegistry()
+    received = registry.counter("controller_messages_received_total", "Vision messages received")
+    stale = registry.counter("controller_stale_messages_total", f"Messages older than {STALE_AGE}s when received")
+    decisions = registry.counter("controller_decisions_total", "Commands sent to the car")
+    registry.gauge("controller_decision_rate", "Commands per second since the previous scrape", fn=rate(decisions))
+    if METRICS_PORT:
+        serve_http(registry, METRICS_PORT)
 
     print("[Control] Controller connected. Waiting for Vision data...")
 
     while True:
         # 1. Get Data (Blocking call - syncs logic with frame rate)
-        data = socket.recv_json()
+        data = wire.recv(socket, with_image=False, stream=STREAM) # binary or legacy JSON messages, this stream only
 
-        prob = data['prob_target']
+        received.inc()
+        capture_ts = data.get('capture_ts') # missing in the JSON payloads of older servers
+        if capture_ts is not None and time.time() - capture_ts > STALE_AGE:
+            stale.inc()
+        prob = data['zones']['center'] # center zone, whatever the server's window layout
 
         # 2. Your Logic
         print(f"Target Probability: {prob:.4f}", end="\r")
 
         if prob > THRESHOLD_CIBLE:
             car.throttle = 0.0
+            decisions.inc()
         elif prob < THRESHOLD_NOCIBLE:
             car.throttle = SPEED_NORMAL
+            decisions.inc()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# Ask a running vision server (started with --reload-port) to load a new
+# model in the background and swap it in between two frames.
+import argparse
+
+import zmq
+
+from reload import RELOAD_PORT
+
+parser = argparse.ArgumentParser(description='Hot-swap the model of a running vision server')
+parser.add_argument('model', type=str, nargs='?', default='', help='path of the new model on the server (default: reload its current --model)')
+parser.add_argument('--host', type=str, default='127.0.0.1', help='vision server address (default: 127.0.0.1)')
+parser.add_argument('--port', type=int, default=RELOAD_PORT, help=f'--reload-port of the server (default: {RELOAD_PORT})')
+parser.add_argument('--timeout', type=float, default=120.0, help='seconds to wait for the model to be loaded (default: 120)')
+args = parser.parse_args()
+
+context = zmq.Context()
+socket = context.socket(zmq.REQ)
+socket.setsockopt(zmq.LINGER, 0)
+socket.connect(f"tcp://{args.host}:{args.port}")
+socket.send_string(args.model)
+
+# The server replies once the model is loaded, warmed up and validated
+if socket.poll(int(args.timeout * 1000)):
+    print(f"[Reload] {socket.recv_string()}")
+else:
+    print(f"[Reload] No reply from {args.host}:{args.port} after {args.timeout:.0f}s")
+socket.close()
+context.term()
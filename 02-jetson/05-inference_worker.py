@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# Inference worker for a vision server started with --workers (or --escalate):
+# pulls the preprocessed crops, runs the model, pushes the probabilities back.
+# Start as many as needed, on this machine or others, at any time.
+# e.g. python3 05-inference_worker.py --host 192.168.37.22 --backend trt --model ../models/resnet18_trt.pth
+import argparse
+
+import workers
+from backends import BACKENDS, DEVICES, create_backend
+
+parser = argparse.ArgumentParser(description='Remote inference worker')
+parser.add_argument('--host', type=str, default='127.0.0.1', help='address of the vision server (default: 127.0.0.1)')
+parser.add_argument('--task-port', type=int, default=workers.TASK_PORT, help=f'--task-port of the server (default: {workers.TASK_PORT})')
+parser.add_argument('--result-port', type=int, default=workers.RESULT_PORT, help=f'--result-port of the server (default: {workers.RESULT_PORT})')
+parser.add_argument('--backend', type=str, default='torch', choices=BACKENDS, help='Inference backend (default: torch)')
+parser.add_argument('--model', type=str, default='', help='PyTorch checkpoint (torch), .onnx file (onnx, opencv) or converted engine (trt)')
+parser.add_argument('--arch', type=str, default='mobilenet_v2', help='Architecture of the checkpoint, torch backend only (default: mobilenet_v2)')
+parser.add_argument('--device', type=str, default='auto', choices=DEVICES, help='auto = cuda for torch/trt if available, cpu for onnx/opencv')
+parser.add_argument('--warmup-crops', type=int, default=3, help='Crops per task the model is warmed up with before joining, 0 = on the first task (default: 3)')
+parser.add_argument('--crop-size', type=int, default=224, help='--crop-size of the server (default: 224)')
+parser.add_argument('--name', type=str, default=None, help='Worker name in the server reports (default: host:pid)')
+parser.add_argument('--tasks', type=int, default=0, help='Leave after this many tasks, 0 = run forever (default: 0)')
+args = parser.parse_args()
+
+print(f"[Model] Loading {args.model or args.arch} with the {args.backend} backend...")
+backend = create_backend(args.backend, args.model, arch=args.arch, device=args.device)
+print(f"[Model] Ready: {backend.describe()}")
+warmup_shape = (args.warmup_crops, 3, args.crop_size, args.crop_size) if args.warmup_crops else None
+workers.serve(backend, args.host, args.task_port, args.result_port, args.name, args.tasks, warmup_shape)
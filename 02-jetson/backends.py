@@ -0,0 +1,331 @@
+import time
+import importlib
+
+import numpy as np
+
+from labels import TARGET_INDEX
+
+# --- CONFIGURATION ---
+BACKENDS = ["torch", "onnx", "opencv", "trt"]
+DEVICES = ["auto", "cpu", "cuda"]
+WARMUP_ITERATIONS = 3
+# Libraries of each backend, only imported when it is created
+LIBRARIES = {
+    "torch": ("torch", "torchvision"),
+    "onnx": ("onnxruntime",),
+    "opencv": ("cv2",),
+    "trt": ("torch", "torchvision", "torch2trt"),
+}
+
+
+def softmax(logits):
+    e = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class Timings:
+    """
+    Time spent in each step of Backend.infer(), with the same steps for
+    every backend so they can be compared on a given machine:
+      upload  - host batch -> device input (0 for the CPU backends)
+      forward - model execution (synchronized on CUDA)
+      output  - softmax and device -> host copy of the probabilities
+    """
+
+    STEPS = ("upload", "forward", "output")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.total = dict.fromkeys(self.STEPS, 0.0)
+        self.last = dict.fromkeys(self.STEPS, 0.0)  # steps of the last call, for the per-frame profiler
+        self.frames = 0
+        self.crops = 0
+
+    def ms_per_crop(self):
+        return 1000.0 * sum(self.total.values()) / self.crops if self.crops else 0.0
+
+    def add(self, step, seconds):
+        self.total[step] += seconds
+        self.last[step] = seconds
+
+    def mean_ms(self):
+        n = max(self.frames, 1)
+        return {step: 1000.0 * t / n for step, t in self.total.items()}
+
+    def format(self):
+        means = self.mean_ms()
+        steps = " | ".join(f"{step} {ms:.2f}ms" for step, ms in means.items())
+        return f"{steps} | total {sum(means.values()):.2f}ms (n={self.frames})"
+
+
+class HostBatch:
+    """Preallocated [N,3,H,W] float32 batch for the backends running on host memory"""
+
+    def __init__(self, shape, array=None):
+        self.array = np.empty(shape, dtype=np.float32) if array is None else array
+
+
+class Backend:
+    """
+    Common interface of the inference backends:
+      allocate(shape) -> buffer with a numpy `array` FramePreprocessor writes into
+      infer(buffer)   -> target probability of each crop, numpy array [N]
+      infer(buffer, select=[0, 2]) -> only runs these crops, array [len(select)]
+    The crops are run in chunks of batch_size (None: all in one pass).
+    Backends with dynamic input shapes (resizable) downscale the crops to
+    input_size before the forward pass when it is set. The others only run
+    their model_size resolution, when they know it (None otherwise).
+    """
+
+    name = None
+    resizable = False
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size
+        self.input_size = None
+        self.model_size = None
+        self.timings = Timings()
+
+    def describe(self):
+        batch = self.batch_size or "all crops"
+        return f"{self.name} on {self.device} (batch {batch})"
+
+    def allocate(self, shape):
+        return HostBatch(shape)
+
+    def _chunks(self, n):
+        size = self.batch_size or n
+        return [(i, min(i + size, n)) for i in range(0, n, size)]
+
+    def warmup(self, shape, iterations=WARMUP_ITERATIONS):
+        """A few passes at the real batch shape (lazy init, kernel selection), not counted in the timings"""
+        buffer = self.allocate(shape)
+        buffer.array[:] = 0.0
+        for _ in range(iterations):
+            self.infer(buffer)
+        self.timings.reset()
+
+    def infer(self, buffer, select=None):
+        raise NotImplementedError
+
+
+class TorchBackend(Backend):
+    """PyTorch eager model built from a torchvision architecture and a trained checkpoint"""
+
+    name = "torch"
+    resizable = True
+
+    def __init__(self, model_path, arch="mobilenet_v2", device="auto", batch_size=None):
+        super().__init__(batch_size)
+        import torch
+
+        self.torch = torch
+        if device == "auto":
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = torch.device(device)
+        self.model = self._load(model_path, arch).to(self.device).eval()
+
+    def _load(self, model_path, arch):
+        from inference import build_model, load_checkpoint
+        model = build_model(arch)
+        if model_path:
+            load_checkpoint(model, model_path, self.device)
+        else:
+            print(f"[Backend] No checkpoint given, {arch} runs with random weights")
+        return model
+
+    def allocate(self, shape):
+        from inference import DeviceBatch
+        return DeviceBatch(shape, self.device)
+
+    def _sync(self):
+        if self.device.type == 'cuda':
+            self.torch.cuda.synchronize()
+
+    def infer(self, buffer, select=None):
+        torch = self.torch
+        start = time.perf_counter()
+        batch = buffer.upload()
+        if select is not None:
+            batch = batch[select]
+        if self.input_size and self.input_size != batch.shape[-1]:
+            # Lower model input resolution, resized on the device
+            batch = torch.nn.functional.interpolate(batch, size=(self.input_size, self.input_size), mode='area')
+        self._sync()
+        uploaded = time.perf_counter()
+
+        with torch.no_grad():
+            # Logits of all the chunks are gathered on the device: one softmax
+            # and one device->host transfer per frame
+            outputs = [self.model(batch[a:b]) for a, b in self._chunks(batch.shape[0])]
+            output = outputs[0] if len(outputs) == 1 else torch.cat(outputs)
+            self._sync()
+            forwarded = time.perf_counter()
+
+            probs = torch.nn.functional.softmax(output, dim=1)[:, TARGET_INDEX].cpu().numpy()
+        done = time.perf_counter()
+
+        self.timings.add("upload", uploaded - start)
+        self.timings.add("forward", forwarded - uploaded)
+        self.timings.add("output", done - forwarded)
+        self.timings.frames += 1
+        self.timings.crops += batch.shape[0]
+        return probs
+
+
+class TRTBackend(TorchBackend):
+    """TensorRT engine converted with torch2trt (00-convert_*.py), loaded in a TRTModule"""
+
+    name = "trt"
+    # The engine is built for one input resolution
+    resizable = False
+
+    def __init__(self, model_path, arch=None, device="cuda", batch_size=None):
+        if device not in ("auto", "cuda"):
+            raise ValueError("TensorRT engines only run on cuda")
+        super().__init__(model_path, arch, "cuda", batch_size)
+
+    def _load(self, model_path, arch):
+        from torch2trt import TRTModule
+        if not model_path:
+            raise ValueError("the trt backend needs --model (engine converted with 00-convert_*.py)")
+        # The engine contains the graph definition, no architecture needed
+        model = TRTModule()
+        model.load_state_dict(self.torch.load(model_path))
+        try:
+            self.model_size = int(model.engine.get_binding_shape(0)[-1])
+        except (AttributeError, TypeError, IndexError):
+            pass  # TensorRT without the binding API: unknown
+        return model
+
+
+class _NumpyBackend(Backend):
+    """
+    Backends fed with a numpy batch and returning numpy outputs. Models
+    exported by onnx_export.py end with a Softmax layer unless
+    --no-activation was given: this is detected on the first pass so the
+    softmax is only applied to raw logits.
+    """
+
+    def __init__(self, batch_size=None):
+        super().__init__(batch_size)
+        self.outputs_probs = None
+
+    def _forward(self, inputs):
+        raise NotImplementedError
+
+    def infer(self, buffer, select=None):
+        inputs = buffer.array if select is None else buffer.array[select]
+        start = time.perf_counter()
+        chunks = self._chunks(inputs.shape[0])
+        if len(chunks) == 1:
+            output = self._forward(inputs)
+        else:
+            # _forward() may return a buffer reused by the next call: copied before the next chunk
+            output = np.concatenate([np.array(self._forward(inputs[a:b])) for a, b in chunks])
+        forwarded = time.perf_counter()
+
+        if self.outputs_probs is None:
+            self.outputs_probs = bool((output >= 0).all() and np.allclose(output.sum(axis=1), 1.0, atol=1e-4))
+            if self.outputs_probs:
+                print(f"[Backend] {self.name}: model already outputs probabilities, no softmax added")
+        probs = output if self.outputs_probs else softmax(output)
+        probs = np.ascontiguousarray(probs[:, TARGET_INDEX])
+        done = time.perf_counter()
+
+        self.timings.add("forward", forwarded - start)
+        self.timings.add("output", done - forwarded)
+        self.timings.frames += 1
+        self.timings.crops += inputs.shape[0]
+        return probs
+
+
+class OnnxBackend(_NumpyBackend):
+    """
+    ONNX Runtime (CPU execution provider, or CUDA with --device cuda) through
+    an OrtEngine: the batches from allocate() are bound once as the model
+    input, so a frame is inferred without any copy or allocation on CPU.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path, arch=None, device="auto", batch_size=None):
+        super().__init__(batch_size)
+        from ort_engine import OrtEngine
+
+        self.device = "cuda" if device == "cuda" else "cpu"
+        self.engine = OrtEngine(model_path, self.device)
+
+        # Models exported without --dynamic-batch only accept their fixed batch
+        # size: shorter chunks (last chunk, select subsets) are zero-padded
+        fixed = self.engine.input_shape[0]
+        self.fixed_batch = fixed if isinstance(fixed, int) else None
+        if self.fixed_batch and (self.batch_size is None or self.batch_size > fixed):
+            self.batch_size = fixed
+        self._padded = None
+        size = self.engine.input_shape[-1]
+        if isinstance(size, int):
+            self.model_size = size
+
+    def allocate(self, shape):
+        # Same `array` interface as HostBatch, the binding is released with the buffer
+        return self.engine.allocate(shape)
+
+    def _forward(self, inputs):
+        n = inputs.shape[0]
+        if self.fixed_batch and n < self.fixed_batch:
+            shape = (self.fixed_batch,) + inputs.shape[1:]
+            if self._padded is None or self._padded.shape != shape:
+                self._padded = self.engine.allocate(shape)
+                self._padded.array[:] = 0.0
+            self._padded.array[:n] = inputs
+            return self.engine.infer(self._padded.array)[:n]
+        return self.engine.infer(inputs)
+
+
+class OpenCVBackend(_NumpyBackend):
+    """OpenCV DNN module reading the same ONNX file (CPU, or CUDA if OpenCV was built with it)"""
+
+    name = "opencv"
+
+    def __init__(self, model_path, arch=None, device="auto", batch_size=None):
+        super().__init__(batch_size)
+        import cv2
+
+        self.device = "cuda" if device == "cuda" else "cpu"
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        if self.device == "cuda":
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
+        else:
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def _forward(self, inputs):
+        self.net.setInput(inputs)
+        return self.net.forward()
+
+
+_CLASSES = {
+    "torch": TorchBackend,
+    "onnx": OnnxBackend,
+    "opencv": OpenCVBackend,
+    "trt": TRTBackend,
+}
+
+
+def import_backend(name):
+    """Import the libraries of a backend, the slow part of a cold start, e.g. to time it apart from the model loading"""
+    if name not in LIBRARIES:
+        raise ValueError(f"unknown backend {name}, expected one of {BACKENDS}")
+    for module in LIBRARIES[name]:
+        importlib.import_module(module)
+
+
+def create_backend(name, model_path, arch="mobilenet_v2", device="auto", batch_size=None):
+    """Instantiate a backend by name. Its library is only imported here, so e.g. onnx runs without torch2trt."""
+    if name not in _CLASSES:
+        raise ValueError(f"unknown backend {name}, expected one of {BACKENDS}")
+    return _CLASSES[name](model_path, arch=arch, device=device, batch_size=batch_size)
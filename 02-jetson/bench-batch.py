@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# Compare one forward pass per crop against a single batched pass for all crops.
+# Runs on CPU, so it can be checked on any machine before deploying on the Jetson.
+import os
+import argparse
+import tempfile
+
+import numpy as np
+import torch
+
+from inference import build_model, load_checkpoint, infer_crops, TARGET_INDEX
+from benchmark import measure, print_report
+
+parser = argparse.ArgumentParser(description='Sequential vs batched crop inference benchmark')
+parser.add_argument('--backend', type=str, default='torch', choices=['torch', 'onnx'], help='inference backend (default: torch)')
+parser.add_argument('--arch', type=str, default='mobilenet_v2', help='model architecture (default: mobilenet_v2)')
+parser.add_argument('--checkpoint', type=str, default='', help='trained checkpoint (default: random weights, timing is the same)')
+parser.add_argument('--crops', type=int, default=3, help='number of crops per frame (default: 3)')
+parser.add_argument('--size', type=int, default=224, help='model input resolution (default: 224)')
+parser.add_argument('--iterations', type=int, default=50, help='timed frames per variant (default: 50)')
+parser.add_argument('--threads', type=int, default=0, help='CPU threads (default: library default)')
+args = parser.parse_args()
+
+device = torch.device('cpu')
+if args.threads:
+    torch.set_num_threads(args.threads)
+
+model = build_model(args.arch)
+if args.checkpoint:
+    load_checkpoint(model, args.checkpoint, device)
+model = model.to(device).eval()
+
+batch = torch.randn(args.crops, 3, args.size, args.size)
+print(f"[Bench] {args.backend} / {args.arch} / {args.crops} crops of {args.size}x{args.size} on CPU")
+
+if args.backend == 'torch':
+    results = {
+        'sequential (N passes)': measure(lambda: infer_crops(model, batch, batched=False), args.iterations),
+        'batched (1 pass)': measure(lambda: infer_crops(model, batch, batched=True), args.iterations),
+    }
+
+    # Sanity check: both modes must give the same probabilities
+    assert np.allclose(infer_crops(model, batch, batched=False), infer_crops(model, batch, batched=True), atol=1e-4)
+
+else:
+    import onnxruntime as ort
+
+    # Export with a dynamic batch axis, like onnx_export.py --dynamic-batch
+    onnx_path = os.path.join(tempfile.mkdtemp(), f"{args.arch}.onnx")
+    torch.onnx.export(model, batch[:1], onnx_path, input_names=["input_0"], output_names=["output_0"],
+                      dynamic_axes={"input_0": {0: "batch"}, "output_0": {0: "batch"}})
+
+    options = ort.SessionOptions()
+    if args.threads:
+        options.intra_op_num_threads = args.threads
+    session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+    inputs = batch.numpy()
+
+    def softmax_target(logits):
+        e = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return (e / e.sum(axis=1, keepdims=True))[:, TARGET_INDEX]
+
+    def sequential():
+        logits = np.concatenate([session.run(None, {"input_0": inputs[i:i + 1]})[0] for i in range(args.crops)])
+        return softmax_target(logits)
+
+    def batched():
+        return softmax_target(session.run(None, {"input_0": inputs})[0])
+
+    results = {
+        'sequential (N passes)': measure(sequential, args.iterations),
+        'batched (1 pass)': measure(batched, args.iterations),
+    }
+
+    assert np.allclose(sequential(), batched(), atol=1e-4)
+
+print_report(results, baseline='sequential (N passes)')
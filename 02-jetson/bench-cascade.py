@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# Cascade (cascade.py) against the big model alone on the validation set:
+# accuracy, escalation rate and latency. The validation images are fed in
+# batches of 3, like the crops of a frame.
+import os
+import argparse
+
+import cv2
+import numpy as np
+
+import cascade
+from backends import BACKENDS, create_backend
+from preprocess import FramePreprocessor
+from benchmark import print_report
+
+parser = argparse.ArgumentParser(description='Cascade vs big model benchmark on the validation set')
+parser.add_argument('--backend', type=str, default='torch', choices=BACKENDS, help='backend of the big model (default: torch)')
+parser.add_argument('--model', type=str, default='', help='big model: checkpoint / .onnx / engine')
+parser.add_argument('--arch', type=str, default='resnet18', help='big model architecture, torch backend (default: resnet18)')
+parser.add_argument('--cascade-backend', type=str, default=None, choices=BACKENDS, help='backend of the gate model (default: --backend)')
+parser.add_argument('--cascade-model', type=str, default='', help='gate model: checkpoint / .onnx / engine')
+parser.add_argument('--cascade-arch', type=str, default=cascade.GATE_ARCH, help=f'gate model architecture, torch backend (default: {cascade.GATE_ARCH})')
+parser.add_argument('--cascade-size', type=int, default=cascade.GATE_SIZE, help=f'gate input resolution (default: {cascade.GATE_SIZE})')
+parser.add_argument('--bands', type=str, default='0.2:0.8,0.1:0.9,0.05:0.95', help='uncertainty bands to compare (default: 0.2:0.8,0.1:0.9,0.05:0.95)')
+parser.add_argument('--device', type=str, default='cpu', help='device (default: cpu)')
+parser.add_argument('--data', type=str, default='../data/val', help='validation set with cible/ and nocible/ (default: ../data/val)')
+parser.add_argument('--limit', type=int, default=0, help='max images per class (default: all)')
+args = parser.parse_args()
+
+BATCH = 3
+SIZE = 224
+
+if not os.path.isdir(os.path.join(args.data, 'cible')):
+    print(f"[Error] {args.data} not found, run data/splitTrainTestVal.py first.")
+    raise SystemExit(1)
+if not (args.model and args.cascade_model):
+    print("[Bench] Warning: random weights, pass --model and --cascade-model for a meaningful comparison")
+
+
+# --- DATA ---
+def list_images(folder):
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder)
+                  if f.lower().endswith(('.jpg', '.jpeg', '.png')))
+
+
+samples = []
+for label in ('cible', 'nocible'):
+    paths = list_images(os.path.join(args.data, label))
+    samples += [(path, label == 'cible') for path in paths[:args.limit or None]]
+preprocess = FramePreprocessor([0], SIZE, SIZE, SIZE)
+images = np.stack([preprocess.normalize(cv2.resize(cv2.imread(path), (SIZE, SIZE))).copy() for path, _ in samples])
+targets = np.array([target for _, target in samples])
+print(f"[Bench] {len(samples)} validation images ({targets.sum()} cible)")
+
+# --- MODELS ---
+big = create_backend(args.backend, args.model, arch=args.arch, device=args.device)
+gate = create_backend(args.cascade_backend or args.backend, args.cascade_model, arch=args.cascade_arch, device=args.device)
+shape = (BATCH, 3, SIZE, SIZE)
+
+
+def run(backend):
+    """Probabilities of all the images and per-batch latencies in ms"""
+    buffer = backend.allocate(shape)
+    backend.warmup(shape)
+    probs = np.empty(len(images), dtype=np.float32)
+    latencies = []
+    for start in range(0, len(images), BATCH):
+        chunk = images[start:start + BATCH]
+        buffer.array[:len(chunk)] = chunk
+        before = sum(backend.timings.total.values())
+        out = backend.infer(buffer, None if len(chunk) == BATCH else list(range(len(chunk))))
+        latencies.append(1000.0 * (sum(backend.timings.total.values()) - before))
+        probs[start:start + len(chunk)] = out
+    return probs, np.array(latencies)
+
+
+def accuracy(probs):
+    return 100.0 * np.mean((probs > 0.5) == targets)
+
+
+p_big, lat_big = run(big)
+results = {'big model alone': lat_big}
+rows = [('big model alone', accuracy(p_big), 100.0, 100.0)]
+for text in args.bands.split(','):
+    band = cascade.parse_band(text.replace(':', ','))
+    backend = cascade.CascadeBackend(gate, big, args.cascade_size, band)
+    p_cascade, lat_cascade = run(backend)
+    name = f'cascade [{band[0]}, {band[1]}]'
+    results[name] = lat_cascade
+    rows.append((name, accuracy(p_cascade), 100.0 * backend.escalation_rate,
+                 100.0 * np.mean((p_cascade > 0.5) == (p_big > 0.5))))
+
+print_report(results, baseline='big model alone')
+print(f"{'variant':<28}{'accuracy':>10}{'escalated':>11}{'same as big':>13}")
+for name, acc, escalated, agree in rows:
+    print(f"{name:<28}{acc:>9.1f}%{escalated:>10.1f}%{agree:>12.1f}%")
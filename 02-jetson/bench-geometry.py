@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# Latency of one frame (preprocessing + batched inference) against the number
+# of windows across the frame (geometry.py), to trade the resolution of the
+# steering signal against compute. Runs on CPU by default.
+import argparse
+
+import numpy as np
+
+from backends import BACKENDS, create_backend
+from geometry import window_offsets
+from preprocess import FramePreprocessor
+from benchmark import measure, print_report
+
+parser = argparse.ArgumentParser(description='Latency vs number of crop windows')
+parser.add_argument('--backend', type=str, default='torch', choices=BACKENDS, help='inference backend (default: torch)')
+parser.add_argument('--model', type=str, default='', help='checkpoint / .onnx / engine (default for torch: random weights, timing is the same)')
+parser.add_argument('--arch', type=str, default='mobilenet_v2', help='model architecture, torch backend (default: mobilenet_v2)')
+parser.add_argument('--device', type=str, default='cpu', help='device (default: cpu)')
+parser.add_argument('--windows', type=str, default='1,2,3,5,7,9', help='window counts to compare (default: 1,2,3,5,7,9)')
+parser.add_argument('--width', type=int, default=320, help='frame width (default: 320)')
+parser.add_argument('--height', type=int, default=224, help='frame height (default: 224)')
+parser.add_argument('--size', type=int, default=224, help='window size (default: 224)')
+parser.add_argument('--iterations', type=int, default=30, help='timed frames per layout (default: 30)')
+args = parser.parse_args()
+
+backend = create_backend(args.backend, args.model, arch=args.arch, device=args.device)
+frame = np.random.randint(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+print(f"[Bench] {backend.describe()}, {args.size}px windows on a {args.width}x{args.height} frame")
+
+results = {}
+for count in [int(n) for n in args.windows.split(",")]:
+    crops_x = window_offsets(args.width, args.size, count=count)
+    shape = (len(crops_x), 3, args.size, args.size)
+    buffer = backend.allocate(shape)
+    preprocess = FramePreprocessor(crops_x, args.size, args.width, args.height, out=buffer.array)
+    backend.warmup(shape)
+
+    def run():
+        preprocess(frame)
+        return backend.infer(buffer)
+
+    label = f"{count} windows (stride {crops_x[1] - crops_x[0] if count > 1 else 0}px)"
+    results[label] = measure(run, args.iterations)
+
+print_report(results, baseline=next(iter(results)))
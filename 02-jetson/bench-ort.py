@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# Per-call cost of plain session.run() against the OrtEngine of the vision
+# server (inputs, outputs and IOBinding created once per shape), at the
+# batch sizes of the server. The smaller the model, the larger the share of
+# this overhead in the frame time.
+# e.g. python3 bench-ort.py --model ../models/mobilenet_v2/mobilenet_v2.onnx --device cuda
+import argparse
+import tracemalloc
+
+import numpy as np
+
+from ort_engine import OrtEngine
+from benchmark import measure, print_report
+
+parser = argparse.ArgumentParser(description='ONNX Runtime session.run vs preallocated IOBinding')
+parser.add_argument('--model', type=str, required=True, help='.onnx model (dynamic batch to test several batch sizes)')
+parser.add_argument('--device', type=str, default='cpu', choices=['cpu', 'cuda'], help='execution provider (default: cpu)')
+parser.add_argument('--batches', type=str, default='1,3', help='comma separated batch sizes (default: 1,3)')
+parser.add_argument('--crop-size', type=int, default=224, help='model input resolution (default: 224)')
+parser.add_argument('--iterations', type=int, default=200, help='timed calls per variant (default: 200)')
+args = parser.parse_args()
+
+engine = OrtEngine(args.model, args.device)
+session = engine.session
+print(f"[Bench] {args.model} on {session.get_providers()[0]}")
+
+
+def allocated_kb(fn, calls=20):
+    """Mean numpy/Python memory allocated per call (peak traced by tracemalloc)"""
+    fn()
+    tracemalloc.start()
+    peak = 0
+    for _ in range(calls):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return peak / calls / 1024.0
+
+
+for n in (int(b) for b in args.batches.split(",")):
+    shape = (n, 3, args.crop_size, args.crop_size)
+    batch = np.random.rand(*shape).astype(np.float32)
+    buffer = engine.allocate(shape)
+    bound = buffer.array
+    bound[:] = batch
+
+    variants = {
+        "session.run": lambda: session.run(None, {engine.input_name: batch}),
+        "engine, copied input": lambda: engine.infer(batch),
+        "engine, bound input": lambda: engine.infer(bound),
+    }
+    if not np.allclose(variants["session.run"]()[0], engine.infer(bound), atol=1e-5):
+        print(f"[Bench] Batch {n}: the engine outputs differ from session.run")
+
+    print(f"\nBatch of {n} crops:")
+    results = {name: measure(fn, args.iterations) for name, fn in variants.items()}
+    print_report(results, baseline="session.run")
+    for name, fn in variants.items():
+        print(f"{name:<28}{allocated_kb(fn):>9.1f} KB allocated per call")
+    overhead = np.mean(results["session.run"]) - np.mean(results["engine, bound input"])
+    print(f"Per-call overhead of session.run: {1000.0 * overhead:.0f}us")
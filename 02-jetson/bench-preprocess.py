@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# Compare the PIL/torchvision get_transform() pipeline used by the vision servers
+# against the vectorized FramePreprocessor, on a 320x224 frame with 3 crops.
+import argparse
+
+import cv2
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+
+from preprocess import FramePreprocessor
+from benchmark import measure, print_report
+
+parser = argparse.ArgumentParser(description='Frame preprocessing microbenchmark')
+parser.add_argument('--image', type=str, default='../data/cible/Image_2025_0005_10_cible.jpg', help='image resized to the camera resolution (default: random frame if missing)')
+parser.add_argument('--iterations', type=int, default=200, help='timed frames per variant (default: 200)')
+args = parser.parse_args()
+
+CAM_WIDTH = 320
+CAM_HEIGHT = 224
+MODEL_INPUT_SIZE = 224
+CROPS_X = [0, 48, 96]
+
+frame = cv2.imread(args.image)
+if frame is None:
+    print(f"[Bench] {args.image} not found, using a random frame")
+    frame = np.random.randint(0, 256, (CAM_HEIGHT, CAM_WIDTH, 3), dtype=np.uint8)
+else:
+    frame = cv2.resize(frame, (CAM_WIDTH, CAM_HEIGHT))
+
+
+def get_transform():
+    # Same pipeline as the vision servers before FramePreprocessor
+    return transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+    ])
+
+
+transform = get_transform()
+
+
+def legacy():
+    image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    crops = [image_rgb[:, x:x + MODEL_INPUT_SIZE] for x in CROPS_X]
+    return torch.stack([transform(transforms.ToPILImage()(c)) for c in crops])
+
+
+preprocess = FramePreprocessor(CROPS_X, crop_size=MODEL_INPUT_SIZE, frame_width=CAM_WIDTH, frame_height=CAM_HEIGHT, bgr=True)
+
+
+def vectorized():
+    return torch.from_numpy(preprocess(frame))
+
+
+# Both paths must produce the same tensor
+diff = (legacy() - vectorized()).abs().max().item()
+print(f"[Bench] max abs difference between pipelines: {diff:.2e}")
+assert diff < 1e-4
+
+print_report({
+    'get_transform() (PIL)': measure(legacy, args.iterations),
+    'FramePreprocessor': measure(vectorized, args.iterations),
+}, baseline='get_transform() (PIL)')
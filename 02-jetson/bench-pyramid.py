@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# Latency cost of each pyramid scale (pyramid.py): preprocessing + batched
+# inference of the regular crops alone, then with the tiles of each scale,
+# then with all the scales together. Runs on CPU by default.
+import argparse
+
+import numpy as np
+
+from backends import BACKENDS, create_backend
+from pyramid import PyramidPreprocessor, parse_scales, tile_positions
+from benchmark import measure, print_report
+
+parser = argparse.ArgumentParser(description='Latency cost of the pyramid scales')
+parser.add_argument('--backend', type=str, default='torch', choices=BACKENDS, help='inference backend (default: torch)')
+parser.add_argument('--model', type=str, default='', help='checkpoint / .onnx / engine (default for torch: random weights, timing is the same)')
+parser.add_argument('--arch', type=str, default='mobilenet_v2', help='model architecture, torch backend (default: mobilenet_v2)')
+parser.add_argument('--device', type=str, default='cpu', help='device (default: cpu)')
+parser.add_argument('--scales', type=str, default='160,112', help='tile sizes to compare (default: 160,112)')
+parser.add_argument('--stride', type=int, default=0, help='pixels between two tiles, 0 = tile size (default: 0)')
+parser.add_argument('--iterations', type=int, default=30, help='timed frames per variant (default: 30)')
+args = parser.parse_args()
+
+CROPS_X = [0, 48, 96]
+CROP_SIZE = 224
+WIDTH, HEIGHT = 320, 224
+
+backend = create_backend(args.backend, args.model, arch=args.arch, device=args.device)
+frame = np.random.randint(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+print(f"[Bench] {backend.describe()}, {len(CROPS_X)} crops on a {WIDTH}x{HEIGHT} frame")
+
+scales = parse_scales(args.scales)
+variants = [[]] + [[size] for size in scales]
+if len(scales) > 1:
+    variants.append(scales)
+
+results = {}
+for variant in variants:
+    n_tiles = sum(len(tile_positions(size, WIDTH, HEIGHT, args.stride)) for size in variant)
+    shape = (len(CROPS_X) + n_tiles, 3, CROP_SIZE, CROP_SIZE)
+    buffer = backend.allocate(shape)
+    pyramid = PyramidPreprocessor(CROPS_X, variant, CROP_SIZE, WIDTH, HEIGHT,
+                                  stride=args.stride or None, out=buffer.array)
+    backend.warmup(shape)
+
+    def run():
+        pyramid(frame)
+        return pyramid.merge(backend.infer(buffer))
+
+    label = "crops only" if not variant else f"+{','.join(map(str, variant))}px ({n_tiles} tiles)"
+    results[label] = measure(run, args.iterations)
+
+print_report(results, baseline="crops only")
+base = np.mean(results["crops only"])
+for label, lat in list(results.items())[1:]:
+    print(f"[Cost] {label}: +{np.mean(lat) - base:.2f}ms per frame")
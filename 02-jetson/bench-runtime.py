@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Compare the torch runtime of the vision server with the torch-free one
+# (NumPy preprocessing, ONNX Runtime, NumPy softmax): import time, model
+# loading, peak resident memory and per-frame latency (preprocessing +
+# inference of the 3 crops). Each runtime is measured in a fresh interpreter.
+# e.g. python3 bench-runtime.py --model ../models/mobilenet_v2.pth.tar --onnx ../models/mobilenet_v2/mobilenet_v2.onnx
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+import numpy as np
+
+from benchmark import measure, print_report
+
+CAM_WIDTH = 320
+CAM_HEIGHT = 224
+MODEL_INPUT_SIZE = 224
+CROPS_X = [0, 48, 96]
+
+parser = argparse.ArgumentParser(description='Torch vs torch-free runtime of the vision server')
+parser.add_argument('--model', type=str, default='', help='checkpoint (torch) or engine (trt) of the torch runtime (default: random weights)')
+parser.add_argument('--arch', type=str, default='mobilenet_v2', help='architecture of the checkpoint (default: mobilenet_v2)')
+parser.add_argument('--torch-backend', type=str, default='torch', choices=['torch', 'trt'], help='backend of the torch runtime (default: torch)')
+parser.add_argument('--onnx', type=str, required=True, help='.onnx export of the same model, run by the torch-free runtime')
+parser.add_argument('--device', type=str, default='auto', choices=['auto', 'cpu', 'cuda'], help='device of both runtimes (default: auto)')
+parser.add_argument('--iterations', type=int, default=200, help='timed frames per runtime (default: 200)')
+parser.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+
+def run_child(backend_name, model_path):
+    """Measure one runtime in this (fresh) interpreter and print the results as JSON"""
+    start = time.perf_counter()
+    import server  # noqa: F401 (every module the server imports at startup)
+    from backends import create_backend, import_backend
+    from preprocess import FramePreprocessor
+    import_backend(backend_name)
+    imported = time.perf_counter()
+
+    backend = create_backend(backend_name, model_path, arch=args.arch, device=args.device)
+    shape = (len(CROPS_X), 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)
+    backend.warmup(shape)
+    loaded = time.perf_counter()
+
+    buffer = backend.allocate(shape)
+    preprocess = FramePreprocessor(CROPS_X, MODEL_INPUT_SIZE, CAM_WIDTH, CAM_HEIGHT, bgr=True, out=buffer.array)
+    frame = np.random.randint(0, 256, (CAM_HEIGHT, CAM_WIDTH, 3), dtype=np.uint8)
+
+    def step():
+        preprocess(frame)
+        backend.infer(buffer)
+
+    latencies = measure(step, args.iterations)
+    print(json.dumps({
+        "describe": backend.describe(),
+        "import": imported - start,
+        "load": loaded - imported,
+        "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,  # KB on Linux
+        "torch": "torch" in sys.modules,
+        "latencies": latencies.tolist(),
+    }))
+
+
+if args.child:
+    run_child(args.child, args.model if args.child != "onnx" else args.onnx)
+    sys.exit(0)
+
+runtimes = {"torch runtime": args.torch_backend, "torch-free runtime": "onnx"}
+results = {}
+for label, backend_name in runtimes.items():
+    print(f"[Bench] {label} ({backend_name})...")
+    child = subprocess.run([sys.executable, __file__, "--child", backend_name] + sys.argv[1:],
+                           capture_output=True, text=True)
+    if child.returncode != 0:
+        print(child.stderr)
+        sys.exit(1)
+    results[label] = json.loads(child.stdout.strip().splitlines()[-1])
+
+print("-" * 78)
+print(f"{'runtime':<22}{'import s':>10}{'load s':>9}{'peak RSS MB':>13}{'torch loaded':>14}  backend")
+print("-" * 78)
+for label, r in results.items():
+    print(f"{label:<22}{r['import']:>10.2f}{r['load']:>9.2f}{r['rss']:>13.0f}{str(r['torch']):>14}  {r['describe']}")
+print()
+print("Per-frame latency (preprocessing + inference of the 3 crops):")
+print_report({label: np.array(r["latencies"]) for label, r in results.items()}, baseline="torch runtime")
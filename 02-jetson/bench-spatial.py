@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# Compare the 3 overlapping crops against one backbone pass on the whole frame
+# (spatial.py): FLOPs, CPU latency and accuracy on the validation set.
+#
+# The validation images are 224x224 crops, so each one is pasted at the
+# position of a zone (x=0/48/96) on a 320x224 background made from another
+# "nocible" image. The crop approach then sees exactly the original image,
+# the spatial approach sees it with its surroundings.
+import os
+import random
+import argparse
+
+import cv2
+import numpy as np
+import torch
+from torch.utils.flop_counter import FlopCounterMode
+
+from inference import build_model, load_checkpoint, TARGET_INDEX
+from preprocess import FramePreprocessor
+from spatial import SpatialModel
+from benchmark import measure, print_report
+
+parser = argparse.ArgumentParser(description='Crops vs spatial (backbone once) inference benchmark')
+parser.add_argument('--arch', type=str, default='mobilenet_v2', help='model architecture (default: mobilenet_v2)')
+parser.add_argument('--checkpoint', type=str, default='', help='trained checkpoint, needed for the accuracy comparison')
+parser.add_argument('--data', type=str, default='../data/val', help='validation set with cible/ and nocible/ (default: ../data/val)')
+parser.add_argument('--limit', type=int, default=0, help='max images per class for the accuracy comparison (default: all)')
+parser.add_argument('--iterations', type=int, default=30, help='timed frames per variant (default: 30)')
+parser.add_argument('--threads', type=int, default=0, help='CPU threads (default: library default)')
+args = parser.parse_args()
+
+CROPS_X = [0, 48, 96]
+CROP_SIZE = 224
+WIDTH, HEIGHT = 320, 224
+
+device = torch.device('cpu')
+if args.threads:
+    torch.set_num_threads(args.threads)
+
+model = build_model(args.arch)
+if args.checkpoint:
+    load_checkpoint(model, args.checkpoint, device)
+model = model.eval()
+spatial = SpatialModel(model, args.arch, WIDTH, HEIGHT, CROPS_X, CROP_SIZE).eval()
+
+preprocess = FramePreprocessor(CROPS_X, CROP_SIZE, WIDTH, HEIGHT)
+
+
+def run_crops(frame):
+    with torch.no_grad():
+        logits = model(torch.from_numpy(preprocess(frame)))
+    return torch.softmax(logits, dim=1)[:, TARGET_INDEX].numpy()
+
+
+def run_spatial(frame):
+    with torch.no_grad():
+        logits = spatial(torch.from_numpy(preprocess.normalize(frame))[None])
+    return torch.softmax(logits, dim=1)[:, TARGET_INDEX].numpy()
+
+
+# --- FLOPS ---
+def count_flops(fn, frame):
+    counter = FlopCounterMode(display=False)
+    with counter:
+        fn(frame)
+    return counter.get_total_flops()
+
+
+frame = np.random.randint(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+flops_crops = count_flops(run_crops, frame)
+flops_spatial = count_flops(run_spatial, frame)
+print(f"[Bench] {args.arch}, {len(CROPS_X)} zones on a {WIDTH}x{HEIGHT} frame, feature map {spatial.feature_shape}")
+print(f"[FLOPs] crops:   {flops_crops / 1e9:.2f} GFLOPs per frame")
+print(f"[FLOPs] spatial: {flops_spatial / 1e9:.2f} GFLOPs per frame (x{flops_crops / flops_spatial:.2f} less)")
+
+# --- LATENCY ---
+print_report({
+    'crops (3x224x224)': measure(lambda: run_crops(frame), args.iterations),
+    'spatial (1x320x224)': measure(lambda: run_spatial(frame), args.iterations),
+}, baseline='crops (3x224x224)')
+
+# --- ACCURACY ---
+def list_images(folder):
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder)
+                  if f.lower().endswith(('.jpg', '.jpeg', '.png')))
+
+
+if not os.path.isdir(os.path.join(args.data, 'cible')):
+    print(f"[Accuracy] {args.data} not found, run data/splitTrainTestVal.py first. Skipped.")
+    raise SystemExit(0)
+if not args.checkpoint:
+    print("[Accuracy] Warning: random weights, pass --checkpoint for a meaningful comparison")
+
+random.seed(0)
+images = {label: list_images(os.path.join(args.data, label)) for label in ('cible', 'nocible')}
+backgrounds = images['nocible']
+correct = {'crops': 0, 'spatial': 0}
+n_images = 0
+agree = 0
+diff = 0.0
+total = 0
+for label, paths in images.items():
+    if args.limit:
+        paths = paths[:args.limit]
+    n_images += len(paths)
+    for path in paths:
+        image = cv2.resize(cv2.imread(path), (CROP_SIZE, CROP_SIZE))
+        background = cv2.resize(cv2.imread(random.choice([b for b in backgrounds if b != path])), (WIDTH, HEIGHT))
+        for zone, x in enumerate(CROPS_X):
+            frame = background.copy()
+            frame[:, x:x + CROP_SIZE] = image
+            p_crops = run_crops(frame)[zone]
+            p_spatial = run_spatial(frame)[zone]
+
+            target = label == 'cible'
+            correct['crops'] += (p_crops > 0.5) == target
+            correct['spatial'] += (p_spatial > 0.5) == target
+            agree += (p_crops > 0.5) == (p_spatial > 0.5)
+            diff += abs(p_crops - p_spatial)
+            total += 1
+
+print(f"[Accuracy] {total} zone samples ({n_images} images x {len(CROPS_X)} positions)")
+print(f"[Accuracy] crops:   {100.0 * correct['crops'] / total:.1f}%")
+print(f"[Accuracy] spatial: {100.0 * correct['spatial'] / total:.1f}%")
+print(f"[Accuracy] same decision on {100.0 * agree / total:.1f}% of the zones, mean |p_crops - p_spatial| = {diff / total:.3f}")
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# Throughput and per-stream latency of the multi-stream server (multistream.py)
+# as the number of streams grows. Every stream plays the same input at its
+# frame rate, like independent cameras, and the results are published on
+# ctrl/<i> as in production.
+import argparse
+
+import numpy as np
+
+from server import build_parser
+import multistream
+
+parser = argparse.ArgumentParser(description='Multi-stream throughput / latency vs stream count')
+parser.add_argument('--streams', type=str, default='1,2,4', help='stream counts to compare (default: 1,2,4)')
+parser.add_argument('--input', type=str, default='demo-direction.mp4', help='input of every stream (default: demo-direction.mp4)')
+parser.add_argument('--frames', type=int, default=150, help='frames published per stream (default: 150)')
+args, server_args = parser.parse_known_args()
+
+rows = []
+for count in [int(n) for n in args.streams.split(",")]:
+    options = build_parser().parse_args(server_args + ['--frames', str(args.frames)])
+    result = multistream.run(options, [args.input] * count, report=False)
+    if result is None:
+        raise SystemExit(1)
+    stats, batcher = result
+    latencies = 1000.0 * np.concatenate([s.latencies for s in stats])
+    rows.append((count, sum(s.mean_fps() for s in stats), np.mean([s.mean_fps() for s in stats]),
+                 np.percentile(latencies, 50), np.percentile(latencies, 95), batcher.crops / max(batcher.batches, 1)))
+
+print("-" * 78)
+print(f"{'streams':<9}{'total FPS':>11}{'FPS/stream':>12}{'p50 ms':>10}{'p95 ms':>10}{'crops/batch':>14}")
+print("-" * 78)
+for count, total, per_stream, p50, p95, crops in rows:
+    print(f"{count:<9}{total:>11.1f}{per_stream:>12.1f}{p50:>10.1f}{p95:>10.1f}{crops:>14.1f}")
+print("-" * 78)
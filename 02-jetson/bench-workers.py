@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# Throughput of the worker pool mode (workers.py) against the number of
+# inference workers, all started on this machine: the capture node reads the
+# input as fast as possible and each run reports the frames published,
+# dropped and the round trip time.
+import sys
+import time
+import argparse
+import subprocess
+
+from server import build_parser
+import workers
+
+parser = argparse.ArgumentParser(description='Worker pool throughput vs number of local workers')
+parser.add_argument('--workers', type=str, default='1,2,4', help='worker counts to compare (default: 1,2,4)')
+parser.add_argument('--backend', type=str, default='onnx', help='backend of the workers (default: onnx)')
+parser.add_argument('--model', type=str, required=True, help='model of the workers')
+parser.add_argument('--input', type=str, default='demo-direction.mp4', help='input of the capture node (default: demo-direction.mp4)')
+parser.add_argument('--frames', type=int, default=200, help='frames published per run (default: 200)')
+args = parser.parse_args()
+
+for count in [int(n) for n in args.workers.split(",")]:
+    print(f"\n[Bench] {count} workers")
+    procs = [subprocess.Popen([sys.executable, "05-inference_worker.py", "--backend", args.backend,
+                               "--model", args.model, "--name", f"w{i}"])
+             for i in range(count)]
+    time.sleep(5)  # model loading
+    try:
+        workers.run(build_parser().parse_args(["--workers", "--input", args.input, "--pace", "max",
+                                               "--frames", str(args.frames)]))
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
@@ -0,0 +1,28 @@
+import time
+
+import numpy as np
+
+
+def measure(fn, iterations=100, warmup=10):
+    """Call fn() repeatedly and return the per-call latencies in milliseconds"""
+    for _ in range(warmup):
+        fn()
+
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies[i] = (time.perf_counter() - start) * 1000.0
+    return latencies
+
+
+def print_report(results, baseline=None):
+    """Print mean/p50/p95 for each named latency array, with the speedup against the baseline name"""
+    print("-" * 66)
+    print(f"{'variant':<28}{'mean ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'speedup':>11}")
+    print("-" * 66)
+    ref = np.mean(results[baseline]) if baseline in results else None
+    for name, lat in results.items():
+        speedup = f"x{ref / np.mean(lat):.2f}" if ref is not None else ""
+        print(f"{name:<28}{np.mean(lat):>9.2f}{np.percentile(lat, 50):>9.2f}{np.percentile(lat, 95):>9.2f}{speedup:>11}")
+    print("-" * 66)
@@ -0,0 +1,113 @@
+import time
+
+import cv2
+import numpy as np
+
+from backends import Backend, Timings, WARMUP_ITERATIONS
+
+# --- CONFIGURATION ---
+GATE_ARCH = "mobilenet_v3_small"
+GATE_SIZE = 112         # input resolution of the gate model
+BAND = (0.2, 0.8)       # gate probabilities re-scored by the big model
+
+
+def parse_band(text):
+    """Uncertainty band from a "low,high" option"""
+    low, high = (float(v) for v in text.split(","))
+    if not 0.0 <= low <= high <= 1.0:
+        raise ValueError(f"the band must be 0 <= low <= high <= 1, got {text}")
+    return low, high
+
+
+class CascadeTimings(Timings):
+    """
+    Steps of CascadeBackend.infer():
+      resize   - crops downscaled to the gate resolution
+      gate     - gate model on every crop
+      escalate - big model on the uncertain crops
+    """
+
+    STEPS = ("resize", "gate", "escalate")
+
+
+class CascadeBatch:
+    """Buffer of the big model (filled by FramePreprocessor) and its downscaled copy for the gate"""
+
+    def __init__(self, big, gate):
+        self.big = big
+        self.gate = gate
+        self.array = big.array
+
+
+class CascadeBackend(Backend):
+    """
+    Two-model cascade: a small gate model scores every crop at a reduced
+    resolution, and only the crops whose probability falls inside the
+    uncertainty band [low, high] are re-scored by the big model. Clear
+    "target" and "no target" crops cost only the gate.
+
+    Both models are regular backends, so e.g. an ONNX gate can escalate
+    to a TensorRT engine.
+    """
+
+    name = "cascade"
+
+    def __init__(self, gate, big, gate_size=GATE_SIZE, band=BAND):
+        super().__init__()
+        self.gate = gate
+        self.big = big
+        self.gate_size = gate_size
+        self.band = band
+        self.device = big.device
+        self.timings = CascadeTimings()
+        self.escalated = 0
+
+    def describe(self):
+        return (f"cascade: {self.gate.describe()} at {self.gate_size}px, "
+                f"{self.big.describe()} on gate probabilities in [{self.band[0]}, {self.band[1]}]")
+
+    def _gate_shape(self, shape):
+        return (shape[0], shape[1], self.gate_size, self.gate_size)
+
+    def allocate(self, shape):
+        return CascadeBatch(self.big.allocate(shape), self.gate.allocate(self._gate_shape(shape)))
+
+    def warmup(self, shape, iterations=WARMUP_ITERATIONS):
+        self.gate.warmup(self._gate_shape(shape), iterations)
+        self.big.warmup(shape, iterations)
+        self.timings.reset()
+        self.escalated = 0
+
+    def infer(self, buffer, select=None):
+        rows = range(buffer.array.shape[0]) if select is None else select
+        start = time.perf_counter()
+        size = (self.gate_size, self.gate_size)
+        for i in rows:
+            for c in range(buffer.array.shape[1]):
+                cv2.resize(buffer.big.array[i, c], size, dst=buffer.gate.array[i, c], interpolation=cv2.INTER_AREA)
+        resized = time.perf_counter()
+
+        probs = self.gate.infer(buffer.gate, select)
+        gated = time.perf_counter()
+
+        low, high = self.band
+        uncertain = np.flatnonzero((probs >= low) & (probs <= high))
+        if len(uncertain):
+            probs[uncertain] = self.big.infer(buffer.big, [rows[j] for j in uncertain])
+        done = time.perf_counter()
+
+        self.timings.add("resize", resized - start)
+        self.timings.add("gate", gated - resized)
+        self.timings.add("escalate", done - gated)
+        self.timings.frames += 1
+        self.timings.crops += len(probs)
+        self.escalated += len(uncertain)
+        return probs
+
+    @property
+    def escalation_rate(self):
+        return self.escalated / self.timings.crops if self.timings.crops else 0.0
+
+    def format(self):
+        return (f"{self.escalated}/{self.timings.crops} crops escalated ({100.0 * self.escalation_rate:.1f}%), "
+                f"{1000.0 * sum(self.timings.total.values()) / max(self.timings.frames, 1):.2f}ms per frame")
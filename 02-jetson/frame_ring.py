@@ -0,0 +1,164 @@
+import os
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# --- CONFIGURATION ---
+NUM_SLOTS = 8
+POLL_INTERVAL = 0.0005  # seconds between two checks for a new frame
+
+
+class FrameRing:
+    """
+    Single-writer ring buffer of fixed-size frames in shared memory.
+
+    Layout: [latest_seq][seq of each slot][timestamp of each slot][frames...]
+    Frame k is written in slot k % n. While a slot is being written its seq
+    is set to -1, so a reader can always tell if the frame it holds is
+    complete and still the one it asked for. Frames are never pickled: the
+    reader gets a numpy view straight into the shared block.
+    """
+
+    def __init__(self, shm, shape, num_slots, owner):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.num_slots = num_slots
+        self._owner = owner
+
+        frame_bytes = int(np.prod(self.shape))
+        self._seqs = np.ndarray((1 + num_slots,), dtype=np.int64, buffer=shm.buf, offset=0)
+        self._stamps = np.ndarray((num_slots,), dtype=np.float64, buffer=shm.buf, offset=8 * (1 + num_slots))
+        offset = self._frames_offset(num_slots)
+        self._frames = np.ndarray((num_slots,) + self.shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+        assert offset + num_slots * frame_bytes <= shm.size
+
+    @staticmethod
+    def _frames_offset(num_slots):
+        header = 8 * (1 + 2 * num_slots)
+        return (header + 63) // 64 * 64
+
+    @classmethod
+    def create(cls, shape, num_slots=NUM_SLOTS):
+        size = cls._frames_offset(num_slots) + num_slots * int(np.prod(shape))
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        ring = cls(shm, shape, num_slots, owner=True)
+        ring._seqs[:] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name, shape, num_slots=NUM_SLOTS):
+        # The capture process is forked and shares the parent's resource
+        # tracker, so the block is only released by the owner's unlink()
+        return cls(shared_memory.SharedMemory(name=name), shape, num_slots, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # --- WRITER SIDE ---
+    def write(self, frame, timestamp, seq=None):
+        """Store a frame. seq defaults to the next number, a source may also skip numbers."""
+        if seq is None:
+            seq = int(self._seqs[0]) + 1
+        slot = seq % self.num_slots
+        self._seqs[1 + slot] = -1
+        np.copyto(self._frames[slot], frame)
+        self._stamps[slot] = timestamp
+        self._seqs[1 + slot] = seq
+        self._seqs[0] = seq
+        return seq
+
+    # --- READER SIDE ---
+    def latest_seq(self):
+        return int(self._seqs[0])
+
+    def read_latest(self, last_seq=-1, timeout=None):
+        """
+        Wait for a frame newer than last_seq and return (seq, timestamp, view).
+        The view is zero-copy: check is_valid(seq) after using it to know if
+        the writer has lapped the ring in the meantime.
+        Returns None on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seq = int(self._seqs[0])
+            if seq > last_seq:
+                slot = seq % self.num_slots
+                timestamp = float(self._stamps[slot])
+                if self._seqs[1 + slot] == seq:
+                    return seq, timestamp, self._frames[slot]
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+
+    def is_valid(self, seq):
+        return int(self._seqs[1 + seq % self.num_slots]) == seq
+
+    def close(self):
+        # Drop the numpy views before closing the mapping
+        self._seqs = self._stamps = self._frames = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+# --- CAPTURE PROCESS ---
+def _capture_main(ring_name, shape, num_slots, opener, opener_args, stop_event, parent_pid):
+    ring = FrameRing.attach(ring_name, shape, num_slots)
+    source = opener(*opener_args)
+    try:
+        # Also stop if the vision server died without calling stop()
+        while not stop_event.is_set() and os.getppid() == parent_pid:
+            frame = source.read()
+            if frame is None:
+                break
+            ring.write(frame.image, frame.timestamp, frame.seq)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        source.close()
+        ring.close()
+
+
+class CaptureProcess:
+    """
+    Run frame acquisition in its own process, writing into a FrameRing.
+    opener(*opener_args) is called in the child and must return a frame
+    source (see sources.py) producing HWC uint8 frames of the ring's shape,
+    e.g. CaptureProcess(shape, open_source, ("csi", 320, 224)).
+
+    The child is forked, so start it BEFORE the parent initializes CUDA.
+    """
+
+    def __init__(self, shape, opener, opener_args=(), num_slots=NUM_SLOTS):
+        self.ring = FrameRing.create(shape, num_slots)
+        ctx = mp.get_context("fork")
+        self._stop = ctx.Event()
+        self.process = ctx.Process(
+            target=_capture_main,
+            args=(self.ring.name, self.ring.shape, num_slots, opener, opener_args, self._stop, os.getpid()),
+            name="capture",
+            daemon=True,
+        )
+
+    def start(self):
+        self.process.start()
+        return self
+
+    def read(self, last_seq=-1, timeout=1.0):
+        """Newest frame as (seq, timestamp, view), or None when the capture process has ended"""
+        while True:
+            frame = self.ring.read_latest(last_seq, timeout=timeout)
+            if frame is not None:
+                return frame
+            if not self.process.is_alive():
+                return None
+
+    def stop(self):
+        self._stop.set()
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
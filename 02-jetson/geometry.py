@@ -0,0 +1,84 @@
+import numpy as np
+
+# --- CONFIGURATION ---
+# The 3 standard zones of a 320x224 frame: left / center / right
+ZONES_X = [0, 48, 96]
+ZONE_SIZE = 224
+
+
+def window_offsets(frame_width, size, count=None, stride=None):
+    """
+    x offsets of square windows of `size` pixels across the frame, either
+    `count` windows evenly spread from the left to the right edge, or one
+    every `stride` pixels (plus one aligned on the right edge if the stride
+    does not end there). count=3 on a 320px frame gives the standard zones.
+    """
+    span = frame_width - size
+    if span < 0:
+        raise ValueError(f"{size}px windows do not fit in a {frame_width}px wide frame")
+    if count is not None:
+        if count < 1:
+            raise ValueError("at least one window is needed")
+        if count == 1:
+            return [span // 2]
+        return [round(i * span / (count - 1)) for i in range(count)]
+    if stride is None or stride < 1:
+        raise ValueError("give a window count or a stride of at least 1px")
+    offsets = list(range(0, span + 1, stride))
+    if offsets[-1] != span:
+        offsets.append(span)
+    return offsets
+
+
+def parse_layout(crops, windows, stride, frame_width, size):
+    """Crop offsets from the server options: explicit list, window count, stride, or the 3 zones"""
+    if crops:
+        return [int(x) for x in crops.split(",")]
+    if windows or stride:
+        return window_offsets(frame_width, size, count=windows or None, stride=stride or None)
+    return list(ZONES_X)
+
+
+def heatmap(probs, crops_x, crop_size, frame_width=None):
+    """
+    1-D target probability across the frame: each pixel column gets the mean
+    probability of the windows covering it (0 where no window does).
+    Without frame_width, the map ends at the right edge of the last window.
+    """
+    if frame_width is None:
+        frame_width = max(crops_x, default=0) + crop_size
+    total = np.zeros(frame_width, dtype=np.float32)
+    count = np.zeros(frame_width, dtype=np.float32)
+    for p, x in zip(probs, crops_x):
+        total[x:x + crop_size] += p
+        count[x:x + crop_size] += 1
+    return np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+
+
+def zone_probs(probs, crops_x, crop_size, frame_width=None, zone_size=ZONE_SIZE):
+    """
+    Reduce any window layout to the 3 zones: left / center / right windows
+    of zone_size pixels (at most the frame width) evenly spread across the
+    frame, 0,48,96 on a 320px frame. Each zone gets the max probability of
+    the windows whose center is closest to its own center; a zone without
+    such a window (e.g. 1 or 2 windows) gets the max of the windows nearest
+    to it. Without frame_width, the frame ends at the right edge of the
+    last window. With the standard layout this returns the probabilities
+    unchanged.
+    """
+    probs = np.asarray(probs, dtype=np.float32)
+    centers = np.asarray(crops_x, dtype=np.float32) + crop_size / 2
+    if frame_width is None:
+        frame_width = max(crops_x, default=0) + crop_size
+    zone_size = min(zone_size, frame_width)
+    zone_centers = np.asarray(window_offsets(frame_width, zone_size, count=3), dtype=np.float32) + zone_size / 2
+    distance = np.abs(centers[:, None] - zone_centers[None, :])
+    nearest = distance.argmin(axis=1)
+    zones = np.zeros(len(zone_centers), dtype=np.float32)
+    for z in range(len(zones)):
+        mine = probs[nearest == z]
+        if not len(mine):
+            # No window of its own: the windows nearest to this zone
+            mine = probs[distance[:, z] == distance[:, z].min()]
+        zones[z] = mine.max()
+    return zones
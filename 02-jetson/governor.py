@@ -0,0 +1,112 @@
+from collections import deque
+
+import numpy as np
+
+# --- CONFIGURATION ---
+WINDOW = 60         # frames in the rolling latency percentile
+HEADROOM = 0.7      # step back up when p95 < HEADROOM * budget
+
+# Knob values when within budget
+NOMINAL = {"preview_fps": 10.0, "preview_quality": 50, "input_size": 224, "crop_every": 1}
+
+# Steps taken one by one while over budget, cheapest loss of quality first:
+# the preview for the viewer, then the model input resolution, then the
+# fraction of the crops inferred on each frame
+LADDER = [
+    ("preview_fps", 5.0),
+    ("preview_quality", 30),
+    ("preview_fps", 2.0),
+    ("input_size", 192),
+    ("crop_every", 2),
+    ("input_size", 160),
+    ("crop_every", 3),
+]
+
+
+class LatencyGovernor:
+    """
+    Keep the rolling p95 of the frame latency under a budget.
+
+    observe() is called with the latency of every published frame. Once
+    the window is full, a p95 over budget moves one step down the ladder
+    and a p95 under HEADROOM * budget moves one step back up; the window is
+    then cleared so the next decision only sees frames of the new level.
+    Each step changes one knob, the settings of a level are the nominal
+    values with the first `level` steps applied, and apply(settings) is
+    called on every change.
+    """
+
+    def __init__(self, budget_ms, apply, nominal=None, ladder=LADDER, window=WINDOW, headroom=HEADROOM):
+        self.budget = budget_ms / 1000.0
+        self.apply = apply
+        self.nominal = dict(NOMINAL if nominal is None else nominal)
+        # Steps on knobs the server can't change (not in nominal) are left out
+        self.ladder = [(knob, value) for knob, value in ladder if knob in self.nominal]
+        self.headroom = headroom
+        self.level = 0
+        self.changes = 0
+        self._latencies = deque(maxlen=window)
+
+    def settings(self, level=None):
+        settings = dict(self.nominal)
+        for knob, value in self.ladder[:self.level if level is None else level]:
+            settings[knob] = value
+        return settings
+
+    def p95(self):
+        return float(np.percentile(self._latencies, 95)) if self._latencies else 0.0
+
+    def observe(self, latency):
+        self._latencies.append(latency)
+        if len(self._latencies) < self._latencies.maxlen:
+            return
+        p95 = self.p95()
+        if p95 > self.budget and self.level < len(self.ladder):
+            self._set_level(self.level + 1, p95, ">")
+        elif p95 < self.headroom * self.budget and self.level > 0:
+            self._set_level(self.level - 1, p95, "<")
+
+    def _set_level(self, level, p95, direction):
+        knob, _ = self.ladder[max(level, self.level) - 1]
+        before = self.settings()[knob]
+        self.level = level
+        settings = self.settings()
+        limit = self.budget if direction == ">" else self.headroom * self.budget
+        print(f"[Governor] p95 {1000.0 * p95:.1f}ms {direction} {1000.0 * limit:.1f}ms: level {level}/{len(self.ladder)}, "
+              f"{knob} {before} -> {settings[knob]}")
+        self.apply(settings)
+        self.changes += 1
+        self._latencies.clear()
+
+    def format(self):
+        return (f"level {self.level}/{len(self.ladder)}, p95 {1000.0 * self.p95():.1f}ms "
+                f"(budget {1000.0 * self.budget:.0f}ms), {self.changes} changes")
+
+
+class CropRotation:
+    """
+    Infer 1 crop out of `every` on each frame, in turn, so each crop is
+    refreshed every `every` frames. The others keep their last probability,
+    which seed() sets from the full frames inferred while every == 1.
+    Same select/update interface as MotionGate.
+    """
+
+    def __init__(self, n_crops, every=1):
+        self.every = every
+        self._probs = np.zeros(n_crops, dtype=np.float32)
+        self._phase = 0
+
+    def select(self, image=None):
+        n = len(self._probs)
+        if self.every <= 1:
+            return list(range(n))
+        self._phase = (self._phase + 1) % self.every
+        return list(range(self._phase, n, self.every))
+
+    def update(self, select, probs):
+        self._probs[select] = probs
+        return self._probs.copy()
+
+    def seed(self, probs):
+        """Probabilities of a frame where every crop was inferred"""
+        self._probs[:] = probs
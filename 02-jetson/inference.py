@@ -0,0 +1,69 @@
+import torch
+import torchvision.models as models
+
+from labels import TARGET_INDEX, NUM_CLASSES
+
+
+def build_model(arch, num_classes=NUM_CLASSES):
+    """Create a torchvision architecture with its last layer reshaped for our classes"""
+    model = models.__dict__[arch](weights=None)
+
+    if hasattr(model, 'fc'):
+        model.fc = torch.nn.Linear(model.fc.in_features, num_classes)
+    elif hasattr(model, 'classifier'):
+        model.classifier[-1] = torch.nn.Linear(model.classifier[-1].in_features, num_classes)
+    else:
+        raise ValueError(f"classifier reshaping not supported for {arch}")
+
+    return model
+
+
+def load_checkpoint(model, path, device):
+    """Load weights saved by trainCBI.py (wrapped in 'state_dict') or a raw state dict"""
+    checkpoint = torch.load(path, map_location=device)
+    if isinstance(checkpoint, dict) and 'state_dict' in checkpoint:
+        model.load_state_dict(checkpoint['state_dict'])
+    else:
+        model.load_state_dict(checkpoint)
+    return model
+
+
+class DeviceBatch:
+    """
+    Preallocated [N,3,H,W] host buffer (pinned on CUDA) and its device copy.
+    FramePreprocessor writes into `array`, upload() returns the device tensor.
+    """
+
+    def __init__(self, shape, device):
+        self.host = torch.empty(shape, dtype=torch.float32)
+        if device.type == 'cuda':
+            self.host = self.host.pin_memory()
+            self.device = torch.empty(shape, dtype=torch.float32, device=device)
+        else:
+            self.device = self.host
+        # numpy view sharing memory with the host tensor
+        self.array = self.host.numpy()
+
+    def upload(self):
+        if self.device is not self.host:
+            self.device.copy_(self.host, non_blocking=True)
+        return self.device
+
+
+def infer_crops(model, batch, batched=True):
+    """
+    Run the model on a [N,3,H,W] batch of crops and return the target
+    probability of each crop as a numpy array of shape [N].
+
+    With batched=False the crops are fed one by one (for engines converted
+    with max_batch_size=1), but the logits are still gathered on the device
+    so there is only one softmax and one device->host transfer per frame.
+    """
+    with torch.no_grad():
+        if batched:
+            output = model(batch)
+        else:
+            output = torch.cat([model(batch[i:i + 1]) for i in range(batch.shape[0])])
+
+        probs = torch.nn.functional.softmax(output, dim=1)[:, TARGET_INDEX]
+        return probs.cpu().numpy()
@@ -0,0 +1,5 @@
+# --- CONFIGURATION ---
+# Kept out of inference.py so the torch-free runtime (onnx / opencv backends) never imports torch
+# ImageFolder sorts the classes alphabetically: ["cible", "nocible"]
+TARGET_INDEX = 0
+NUM_CLASSES = 2
@@ -0,0 +1,159 @@
+import time
+import bisect
+import threading
+
+# --- CONFIGURATION ---
+# Upper bounds of the stage latency histograms, in seconds
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+PUBLISH_PERIOD = 1.0  # seconds between two messages on the ZMQ metrics topic
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+class Counter:
+    """Monotonic count: inc() in the loop is a single integer add"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, fn=None):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def samples(self):
+        yield self.name, {}, self.fn() if self.fn is not None else self.value
+
+
+class Gauge(Counter):
+    """Current value, set() in the loop or read from fn() when scraped"""
+
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+
+class Info(Counter):
+    """Constant 1 with descriptive labels (backend, device...), fn() returns the labels"""
+
+    kind = "gauge"
+
+    def samples(self):
+        yield self.name, self.fn(), 1
+
+
+class Histogram:
+    """
+    Prometheus histogram, optionally split by one label (e.g. the stage).
+    observe() only finds the bucket and increments it, the cumulative
+    counts are computed when the metrics are rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=STAGE_BUCKETS, label=None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}  # label value -> [bucket counts + overflow, sum]
+
+    def observe(self, value, label_value=None):
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self):
+        for label_value, (counts, total) in list(self._series.items()):
+            labels = {self.label: label_value} if self.label else {}
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", dict(labels, le=bound), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """
+    Metrics of one process, rendered in the Prometheus text format. The hot
+    loop only touches plain attributes (Counter.inc, Histogram.observe) or
+    nothing at all: values that already exist elsewhere (frame counters,
+    backend name) are read by fn() callables when the metrics are scraped.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, fn=None):
+        return self._add(Counter(name, help, fn))
+
+    def gauge(self, name, help, fn=None):
+        return self._add(Gauge(name, help, fn))
+
+    def info(self, name, help, fn):
+        return self._add(Info(name, help, fn))
+
+    def histogram(self, name, help, buckets=STAGE_BUCKETS, label=None):
+        return self._add(Histogram(name, help, buckets, label))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def rate(counter):
+    """fn() for a gauge: per-second increase of a counter since the previous scrape"""
+    last = [counter.value, time.monotonic()]
+
+    def fn():
+        value, now = counter.value, time.monotonic()
+        result = (value - last[0]) / (now - last[1]) if now > last[1] else 0.0
+        last[:] = value, now
+        return round(result, 2)
+
+    return fn
+
+
+def serve_http(registry, port):
+    """Serve registry.render() on http://<host>:port/metrics from a background thread"""
+    # Only imported when the metrics are served (startup time)
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"[Metrics] Prometheus metrics on http://<host>:{port}/metrics")
+    return server
@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+
+# --- CONFIGURATION ---
+DOWNSCALE = 8       # the change score is computed on a 1/8 grayscale frame (40x28 for 320x224)
+BLOCK = 4           # cells of the small frame per block side (32px): the score is the max over the blocks
+THRESHOLD = 4.0     # mean absolute gray level difference (0-255) of a block above which a crop is inferred again
+MAX_SKIP_AGE = 10   # a crop is inferred at least once every MAX_SKIP_AGE frames
+
+
+class MotionGate:
+    """
+    Skip the inference of the crops that did not change.
+
+    Each frame is reduced to a small grayscale image. The score of a crop is
+    the largest mean absolute difference, over any block of block x block
+    cells of its area, between this image and the one of the frame where
+    the crop was last inferred (not the previous frame, so a slow drift
+    still adds up). A small target moving in the crop changes a block a
+    lot but the crop mean little. Crops below the threshold reuse their
+    previous probability, unless they have been skipped max_age times in a
+    row.
+
+        select = gate.select(image)       # indices of the crops to infer
+        probs = gate.update(select, out)  # out = probabilities of those crops
+    """
+
+    def __init__(self, crops_x, crop_size, threshold=THRESHOLD, max_age=MAX_SKIP_AGE, downscale=DOWNSCALE, block=BLOCK):
+        self.threshold = threshold
+        self.max_age = max_age
+        self.downscale = downscale
+        self.block = block
+        # Crop windows in the downscaled image
+        self._windows = [(x // downscale, (x + crop_size + downscale - 1) // downscale) for x in crops_x]
+
+        n = len(self._windows)
+        self._reference = [None] * n
+        self._age = np.zeros(n, dtype=np.int64)
+        self._probs = np.zeros(n, dtype=np.float32)
+        self._small = None
+
+        self.frames = 0
+        self.crops = 0
+        self.skipped = 0
+
+    def _reduce(self, image):
+        h, w = image.shape[:2]
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (w // self.downscale, h // self.downscale), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def scores(self, small):
+        """Change score of each crop, inf for the crops never inferred"""
+        scores = np.full(len(self._windows), np.inf)
+        for i, (a, b) in enumerate(self._windows):
+            if self._reference[i] is not None:
+                diff = np.abs(small[:, a:b] - self._reference[i]).astype(np.float32)
+                # Mean of every block x block window, then the largest one
+                scores[i] = cv2.blur(diff, (self.block, self.block), borderType=cv2.BORDER_REPLICATE).max()
+        return scores
+
+    def select(self, image):
+        self._small = self._reduce(image)
+        scores = self.scores(self._small)
+        run = (scores > self.threshold) | (self._age + 1 >= self.max_age)
+        return np.flatnonzero(run).tolist()
+
+    def update(self, select, probs):
+        """Store the new probabilities of the inferred crops and return those of all the crops"""
+        n = len(self._windows)
+        self._age += 1
+        for i, p in zip(select, probs):
+            a, b = self._windows[i]
+            self._reference[i] = self._small[:, a:b].copy()
+            self._age[i] = 0
+            self._probs[i] = p
+
+        self.frames += 1
+        self.crops += n
+        self.skipped += n - len(select)
+        return self._probs.copy()
+
+    @property
+    def skip_rate(self):
+        return self.skipped / self.crops if self.crops else 0.0
+
+    def format(self, ms_per_crop=None):
+        text = f"{self.skipped}/{self.crops} crops skipped ({100.0 * self.skip_rate:.1f}%)"
+        if ms_per_crop is not None and self.frames:
+            text += f", ~{ms_per_crop * self.skipped / self.frames:.2f}ms of inference saved per frame"
+        return text
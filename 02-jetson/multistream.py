@@ -0,0 +1,279 @@
+import time
+import queue
+import threading
+from collections import deque
+
+import numpy as np
+import zmq
+
+from backends import create_backend
+from geometry import parse_layout
+from preprocess import FramePreprocessor
+from pipeline import BufferPool
+from publisher import ResultPublisher
+from sources import open_source
+
+# --- CONFIGURATION ---
+MAX_WAIT = 5.0      # ms a batch waits for the crops of other streams
+SLOTS = 2           # preprocessing buffers per stream: one being filled, one waiting in the batcher
+REPORT_EVERY = 5.0  # seconds between two reports
+FPS_WINDOW = 1.0
+LATENCY_WINDOW = 500  # latest latencies kept per stream for the percentiles
+
+
+class StreamStats:
+    """Published frames, FPS over the last FPS_WINDOW seconds and latest capture->publish latencies of one stream"""
+
+    def __init__(self, name):
+        self.name = name
+        self.published = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.first = self.last = None
+        self._times = deque()
+
+    def add(self, latency):
+        now = time.time()
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self._times.append(now)
+        while now - self._times[0] > FPS_WINDOW:
+            self._times.popleft()
+        self.published += 1
+        self.latencies.append(latency)
+
+    def fps(self):
+        span = self._times[-1] - self._times[0] if self._times else 0.0
+        return (len(self._times) - 1) / span if span > 0 else 0.0
+
+    def mean_fps(self):
+        """Average rate since the first published frame"""
+        return (self.published - 1) / (self.last - self.first) if self.published > 1 else 0.0
+
+    def format(self):
+        lat = 1000.0 * np.asarray(self.latencies or [0.0])
+        return (f"{self.name}: {self.fps():.1f} FPS, latency p50 {np.percentile(lat, 50):.1f}ms "
+                f"p95 {np.percentile(lat, 95):.1f}ms (n={self.published})")
+
+
+class DynamicBatcher(threading.Thread):
+    """
+    Gather the crops of several streams into shared forward passes.
+
+    Streams submit() their preprocessed [n,3,S,S] crops. The batcher takes
+    the first waiting request, then keeps adding requests until the batch
+    holds max_batch crops or max_wait has elapsed since that first request
+    arrived, copies them into one preallocated batch and runs the backend
+    once. The probabilities are split back per request and handed to
+    on_result(request, probs). A request that does not fit starts the next
+    batch.
+    """
+
+    def __init__(self, backend, crop_shape, max_batch, max_wait_ms, on_result):
+        super().__init__(name="batcher", daemon=True)
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.on_result = on_result
+        self.buffer = backend.allocate((max_batch,) + tuple(crop_shape))
+        self._requests = queue.Queue()
+        self._carry = None
+        self._stopping = threading.Event()
+
+        self.batches = 0
+        self.crops = 0
+        self.wait_time = 0.0
+        self.error = None
+
+    def submit(self, request, crops, release):
+        """Queue the crops of one frame. release() is called once they are copied into a batch."""
+        self._requests.put((time.perf_counter(), request, crops, release))
+
+    def _next(self, timeout=None):
+        if self._carry is not None:
+            item, self._carry = self._carry, None
+            return item
+        return self._requests.get(timeout=timeout)
+
+    def _gather(self):
+        try:
+            first = self._next(timeout=0.1)
+        except queue.Empty:
+            return []
+        gather_start = time.perf_counter()
+        items = [first]
+        n = len(first[2])
+        deadline = first[0] + self.max_wait
+        while n < self.max_batch:
+            # Requests already waiting are always taken, the deadline only
+            # bounds the wait for new ones
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._next(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if n + len(item[2]) > self.max_batch:
+                self._carry = item
+                break
+            items.append(item)
+            n += len(item[2])
+        self.wait_time += time.perf_counter() - gather_start
+        return items
+
+    def run(self):
+        try:
+            while not self._stopping.is_set():
+                items = self._gather()
+                if not items:
+                    continue
+                row = 0
+                for _, _, crops, release in items:
+                    self.buffer.array[row:row + len(crops)] = crops
+                    row += len(crops)
+                    release()
+                probs = self.backend.infer(self.buffer, None if row == self.max_batch else list(range(row)))
+                row = 0
+                for _, request, crops, _ in items:
+                    self.on_result(request, probs[row:row + len(crops)])
+                    row += len(crops)
+                self.batches += 1
+                self.crops += row
+        except Exception as e:
+            self.error = e
+
+    def pending(self):
+        return self._requests.qsize() + (self._carry is not None)
+
+    def stop(self):
+        self._stopping.set()
+
+    def format(self):
+        if not self.batches:
+            return "no batch yet"
+        return (f"{self.batches} batches, {self.crops / self.batches:.1f} crops per batch (max {self.max_batch}), "
+                f"gather {1000.0 * self.wait_time / self.batches:.2f}ms per batch")
+
+
+def run(args, streams, report=True):
+    """
+    Serve several sources with one backend (server options in args). Each
+    stream is read and preprocessed by its own thread, the batcher runs the
+    model and a publish thread sends the results of stream i on the
+    "ctrl/<i>" and "prev/<i>" topics. Returns the StreamStats of the
+    streams and the batcher once every stream has published args.frames
+    frames (or Ctrl+C).
+    """
+    crops_x = parse_layout(args.crops, args.windows, args.stride, args.width, args.crop_size)
+    crop_shape = (3, args.crop_size, args.crop_size)
+    max_batch = args.max_batch or len(crops_x) * len(streams)
+    if max_batch < len(crops_x):
+        # The crops of one frame are never split across batches
+        print(f"[Error] --max-batch {max_batch} is smaller than the {len(crops_x)} crops of a frame")
+        return None
+    print(f"[Init] {len(streams)} streams, {len(crops_x)} crops of {args.crop_size}px at x={crops_x}, "
+          f"batches of up to {max_batch} crops, max wait {args.max_wait}ms")
+
+    context = zmq.Context()
+    publisher = ResultPublisher(context, args.port, crops_x, args.crop_size, "binary",
+                                args.preview_fps, args.preview_scale, args.preview_quality)
+    print(f"[Comms] ZMQ Publisher bound to port {args.port}")
+
+    sources = []
+    try:
+        for spec in streams:
+            print(f"[Camera] Opening {spec} ({args.pace})...")
+            sources.append(open_source(spec, args.width, args.height, args.mirror, args.pace))
+    except Exception as e:
+        print(f"[Error] Could not open video source: {e}")
+        for source in sources:
+            source.close()
+        publisher.close()
+        return None
+
+    print(f"[Model] Loading {args.model or args.arch} with the {args.backend} backend...")
+    backend = create_backend(args.backend, args.model, arch=args.arch, device=args.device,
+                             batch_size=args.batch_size or None)
+    backend.warmup((max_batch,) + crop_shape)
+    print(f"[Model] Ready: {backend.describe()}")
+
+    stats = [StreamStats(str(i)) for i in range(len(streams))]
+    results = queue.Queue()
+    batcher = DynamicBatcher(backend, crop_shape, max_batch, args.max_wait,
+                             lambda request, probs: results.put((request, np.array(probs))))
+    stop = threading.Event()
+    submitted = [0] * len(streams)  # frames handed to the batcher, per stream
+
+    # --- STAGES ---
+    def read_stream(index, source):
+        # Stream i: capture + preprocessing into its own buffers, then the batcher
+        pool = BufferPool([FramePreprocessor(crops_x, args.crop_size, args.width, args.height, bgr=True)
+                           for _ in range(SLOTS)])
+        while not stop.is_set() and not (args.frames and submitted[index] >= args.frames):
+            frame = source.read()
+            if frame is None:
+                break
+            preprocess = pool.acquire()
+            crops = preprocess(frame.image)
+            submitted[index] += 1
+            batcher.submit((index, frame), crops, lambda p=preprocess: pool.release(p))
+
+    def publish():
+        remaining = len(streams)
+        ended = set()
+        while not stop.is_set():
+            try:
+                (index, frame), probs = results.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            stream = stats[index]
+            fps = stream.fps()
+            publisher.send_control(frame.seq, probs, fps, frame.timestamp, stream=stream.name)
+            if publisher.preview_due(stream=stream.name):
+                jpeg = publisher.encode_preview(frame.image)
+                publisher.send_preview(frame.seq, probs, fps, frame.timestamp, jpeg, stream=stream.name)
+            stream.add(time.time() - frame.timestamp)
+            if args.frames and stream.published >= args.frames and index not in ended:
+                ended.add(index)
+                remaining -= 1
+                if not remaining:
+                    stop.set()
+
+    readers = [threading.Thread(target=read_stream, args=(i, source), daemon=True) for i, source in enumerate(sources)]
+    publish_thread = threading.Thread(target=publish, daemon=True)
+    start = time.time()
+
+    def print_report():
+        elapsed = time.time() - start
+        total = sum(s.published for s in stats)
+        print(f"[Batcher] {batcher.format()} | {backend.name}: {backend.timings.format()}")
+        print(f"[Streams] {total / elapsed:.1f} frames/s in total | " + " | ".join(s.format() for s in stats))
+
+    try:
+        batcher.start()
+        publish_thread.start()
+        for reader in readers:
+            reader.start()
+        print("[System] Multi-stream Inference Loop Started.")
+        next_report = time.monotonic() + REPORT_EVERY
+        while not stop.wait(0.1):
+            if batcher.error is not None:
+                raise batcher.error
+            if not any(r.is_alive() for r in readers) and sum(s.published for s in stats) >= sum(submitted):
+                # Every source ended and every frame submitted to the batcher
+                # (queued, in a running batch or being sent) is published
+                break
+            if report and time.monotonic() >= next_report:
+                print_report()
+                next_report += REPORT_EVERY
+    except KeyboardInterrupt:
+        print("\n[System] Stopping...")
+    finally:
+        stop.set()
+        batcher.stop()
+        for thread in readers + [batcher, publish_thread]:
+            thread.join(timeout=1.0)
+        print_report()
+        for source in sources:
+            source.close()
+        publisher.close()
+    return stats, batcher
@@ -0,0 +1,96 @@
+import weakref
+
+import numpy as np
+
+from labels import NUM_CLASSES
+
+
+class BoundBatch:
+    """
+    IOBinding of one input shape: host `array` bound as the model input
+    (uploaded into a device OrtValue on CUDA) and host output. Returned by
+    OrtEngine.allocate(), it has the `array` interface of the backend
+    buffers, and its binding is released with it.
+    """
+
+    def __init__(self, engine, shape):
+        ort = engine.ort
+        self.shape = shape
+        self.binding = engine.session.io_binding()
+        self.array = np.empty(shape, dtype=np.float32)
+        if engine.device == "cuda":
+            # Device input, filled from any host array by update_inplace() (one upload, no allocation)
+            self.value = ort.OrtValue.ortvalue_from_shape_and_type(shape, np.float32, "cuda", engine.device_id)
+        else:
+            # The session reads the host array itself, without copy
+            self.value = ort.OrtValue.ortvalue_from_numpy(self.array)
+        self.binding.bind_ortvalue_input(engine.input_name, self.value)
+
+        # Outputs are always written to host memory: [N, classes] probabilities or logits
+        self.output = np.empty((shape[0], engine.n_classes), dtype=np.float32)
+        self.binding.bind_ortvalue_output(engine.output_names[0], ort.OrtValue.ortvalue_from_numpy(self.output))
+        for name in engine.output_names[1:]:
+            self.binding.bind_output(name, "cpu")
+
+
+class OrtEngine:
+    """
+    ONNX Runtime session whose inputs and outputs are allocated and bound
+    once per input shape, on CPU or CUDA.
+
+    infer(batch) looks up the IOBinding of batch.shape (created on first
+    use, so a new one only when the batch size changes), puts the batch in
+    the bound input and runs the session: no tensor or binding is
+    allocated per call. The buffers returned by allocate() have their own
+    binding: on CPU their array is the bound input, so filling it and
+    calling infer(buffer.array) copies nothing; any other array is copied
+    into the bound input of its shape. On CUDA the batch is uploaded into
+    the bound device input.
+
+    The returned [N, classes] array is the bound output buffer: it is
+    overwritten by the next call with the same shape.
+    """
+
+    def __init__(self, model_path, device="cpu", device_id=0):
+        import onnxruntime as ort
+
+        self.ort = ort
+        self.device = device
+        self.device_id = device_id
+        providers = ["CPUExecutionProvider"]
+        if device == "cuda":
+            providers.insert(0, ("CUDAExecutionProvider", {"device_id": device_id}))
+        self.session = ort.InferenceSession(model_path, providers=providers)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = model_input.shape  # dims are names (e.g. "batch") when dynamic
+        self.output_names = [o.name for o in self.session.get_outputs()]
+        classes = self.session.get_outputs()[0].shape[-1]
+        self.n_classes = classes if isinstance(classes, int) else NUM_CLASSES
+
+        self._shapes = {}   # shape -> BoundBatch of the arrays infer() copies into
+        # id(array) -> BoundBatch from allocate(), only while the caller keeps it
+        # (temporary buffers, e.g. of a warmup, do not pin bound memory)
+        self._arrays = weakref.WeakValueDictionary()
+
+    def allocate(self, shape):
+        """BoundBatch of this shape: fill its array, then infer() it without copy"""
+        batch = BoundBatch(self, tuple(shape))
+        self._arrays[id(batch.array)] = batch
+        return batch
+
+    def _bind(self, shape):
+        binding = self._shapes[shape] = BoundBatch(self, shape)
+        return binding
+
+    def infer(self, batch):
+        """[N, classes] outputs of a float32 [N,3,H,W] host batch"""
+        binding = self._arrays.get(id(batch))
+        if binding is None or binding.array is not batch:
+            binding = self._shapes.get(batch.shape) or self._bind(batch.shape)
+            if self.device != "cuda":
+                np.copyto(binding.array, batch)
+        if self.device == "cuda":
+            binding.value.update_inplace(batch)
+        self.session.run_with_iobinding(binding.binding)
+        return binding.output
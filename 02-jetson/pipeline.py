@@ -0,0 +1,189 @@
+import queue
+import threading
+import time
+from collections import deque
+
+
+class LatestQueue:
+    """
+    Bounded queue between two stages. When it is full the OLDEST item is
+    dropped (newest wins), so a slow stage always works on a recent frame
+    and latency stays bounded instead of growing with a backlog.
+    """
+
+    def __init__(self, maxsize=1, on_drop=None):
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        stale = None
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                stale = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+        if stale is not None and self.on_drop is not None:
+            self.on_drop(stale)
+
+    def get(self):
+        """Block until an item is available. Returns None once the queue is closed and empty."""
+        with self._cond:
+            while not self._items and not self._closed:
+                self._cond.wait()
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class BufferPool:
+    """
+    Fixed set of preallocated buffers. A stage acquires one to fill it and a
+    later stage releases it once consumed, so a buffer is never overwritten
+    while in use. acquire() blocks when all the buffers are in flight.
+    """
+
+    def __init__(self, buffers):
+        self._free = queue.Queue()
+        for b in buffers:
+            self._free.put(b)
+
+    def acquire(self):
+        return self._free.get()
+
+    def release(self, buffer):
+        self._free.put(buffer)
+
+
+class Stage(threading.Thread):
+    """
+    Worker thread running one pipeline step. The first stage (no inbox) is
+    the source: fn() is called without argument and returning None ends the
+    stream. For the other stages fn(item) returning None skips the item.
+    """
+
+    def __init__(self, name, fn, inbox, outbox, stop_event):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = stop_event
+        self.processed = 0
+        self.busy_time = 0.0
+        self.error = None
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                if self.inbox is None:
+                    start = time.perf_counter()
+                    result = self.fn()
+                    if result is None:
+                        break
+                else:
+                    item = self.inbox.get()
+                    if item is None:
+                        break
+                    start = time.perf_counter()
+                    result = self.fn(item)
+
+                self.busy_time += time.perf_counter() - start
+                self.processed += 1
+                if result is not None and self.outbox is not None:
+                    self.outbox.put(result)
+        except Exception as e:
+            self.error = e
+            self.stop_event.set()
+        finally:
+            # Let the downstream stages drain and exit
+            if self.outbox is not None:
+                self.outbox.close()
+
+
+class Pipeline:
+    """
+    Run each stage in its own thread, connected by drop-oldest queues.
+    stages is a list of (name, fn) where the first one is the frame source,
+    or (name, fn, on_drop) to be notified of the outputs of that stage that
+    were dropped (e.g. to give a buffer back to its BufferPool).
+    Heavy steps (camera read, torch/TensorRT, cv2.imencode, zmq send) release
+    the GIL, so e.g. JPEG encoding of frame N overlaps inference of frame N+1.
+    """
+
+    def __init__(self, stages, queue_size=1):
+        stages = [tuple(s) + (None,) * (3 - len(s)) for s in stages]
+        self.queues = [LatestQueue(queue_size, on_drop) for _, _, on_drop in stages[:-1]]
+        self._stop = threading.Event()
+        self.workers = []
+        for i, (name, fn, _) in enumerate(stages):
+            inbox = self.queues[i - 1] if i > 0 else None
+            outbox = self.queues[i] if i < len(self.queues) else None
+            self.workers.append(Stage(name, fn, inbox, outbox, self._stop))
+
+    def stats(self):
+        """Per-stage queue depth (waiting in the inbox), dropped items and processed items"""
+        stats = {}
+        for w in self.workers:
+            stats[w.name] = {
+                "depth": len(w.inbox) if w.inbox is not None else 0,
+                "dropped": w.inbox.dropped if w.inbox is not None else 0,
+                "processed": w.processed,
+                "busy_ms": 1000.0 * w.busy_time / w.processed if w.processed else 0.0,
+            }
+        return stats
+
+    def format_stats(self):
+        return " | ".join(
+            f"{name}: q={s['depth']} drop={s['dropped']} n={s['processed']} {s['busy_ms']:.1f}ms"
+            for name, s in self.stats().items()
+        )
+
+    def stop(self):
+        self._stop.set()
+        for q in self.queues:
+            q.close()
+
+    def run(self, report_every=5.0):
+        """Start the stages and block until the source ends, a stage fails or Ctrl+C"""
+        for w in self.workers:
+            w.start()
+        next_report = time.monotonic() + report_every
+        try:
+            # Short waits so the call returns as soon as the source has ended
+            while any(w.is_alive() for w in self.workers):
+                if self._stop.wait(0.1):
+                    break
+                if time.monotonic() >= next_report:
+                    print(f"[Pipeline] {self.format_stats()}")
+                    next_report += report_every
+        finally:
+            self.stop()
+            for w in self.workers:
+                w.join(timeout=1.0)
+
+        for w in self.workers:
+            if w.error is not None:
+                raise w.error
+
+
+def run_sequential(stages):
+    """Same stages as Pipeline, run one after the other in the calling thread"""
+    source = stages[0][1]
+    while True:
+        item = source()
+        if item is None:
+            break
+        for _, fn, *_ in stages[1:]:
+            item = fn(item)
+            if item is None:
+                break
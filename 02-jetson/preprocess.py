@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+
+# --- CONFIGURATION ---
+# ImageNet statistics, same as the Normalize() used during training
+MEAN = [0.485, 0.456, 0.406]
+STD = [0.229, 0.224, 0.225]
+
+
+class FramePreprocessor:
+    """
+    Vectorized replacement for ToPILImage -> Resize -> ToTensor -> Normalize.
+
+    The whole frame is converted once per call (BGR->RGB, uint8->float,
+    mean/std) into a preallocated [3,H,W] float buffer. The crops are views
+    of that buffer and are copied once into a preallocated [N,3,S,S] batch,
+    which is reused from frame to frame.
+
+    frame_out can be given to normalize the frame directly into a [3,H,W]
+    model input (e.g. spatial inference on the whole frame, with no crops).
+    """
+
+    def __init__(self, crops_x, crop_size=224, frame_width=320, frame_height=224, bgr=True, out=None, frame_out=None):
+        if crop_size != frame_height:
+            raise ValueError(f"crops must span the full frame height ({frame_height}px), got {crop_size}px")
+        for x in crops_x:
+            if x < 0 or x + crop_size > frame_width:
+                raise ValueError(f"crop at x={x} does not fit in a {frame_width}px wide frame")
+
+        self.crops_x = list(crops_x)
+        self.crop_size = crop_size
+        self.frame_shape = (frame_height, frame_width, 3)
+        self.bgr = bgr
+
+        # out = scale * pixel - shift  <=>  (pixel / 255 - mean) / std
+        std = np.array(STD, dtype=np.float32).reshape(3, 1, 1)
+        mean = np.array(MEAN, dtype=np.float32).reshape(3, 1, 1)
+        self._scale = 1.0 / (255.0 * std)
+        self._shift = mean / std
+
+        frame_shape = (3, frame_height, frame_width)
+        if frame_out is None:
+            frame_out = np.empty(frame_shape, dtype=np.float32)
+        elif frame_out.shape != frame_shape or frame_out.dtype != np.float32:
+            raise ValueError(f"frame buffer must be float32 {frame_shape}, got {frame_out.dtype} {frame_out.shape}")
+        self._frame = frame_out
+
+        batch_shape = (len(self.crops_x), 3, crop_size, crop_size)
+        if out is None:
+            out = np.empty(batch_shape, dtype=np.float32)
+        elif out.shape != batch_shape or out.dtype != np.float32:
+            raise ValueError(f"output buffer must be float32 {batch_shape}, got {out.dtype} {out.shape}")
+        self.batch = out
+        # time.perf_counter() between normalization and crop copies of the last call (profiler)
+        self.normalized_at = None
+
+    def normalize(self, frame):
+        """Convert a HWC uint8 frame into the normalized [3,H,W] buffer"""
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"expected a frame of shape {self.frame_shape}, got {frame.shape}")
+
+        # HWC -> CHW (and BGR -> RGB) are only strides, no copy until the multiply
+        chw = frame.transpose(2, 0, 1)
+        if self.bgr:
+            chw = chw[::-1]
+        np.multiply(chw, self._scale, out=self._frame)
+        self._frame -= self._shift
+        return self._frame
+
+    def crops(self):
+        """Zero-copy [3,S,S] views of the last normalized frame, one per crop"""
+        return [self._frame[:, :, x:x + self.crop_size] for x in self.crops_x]
+
+    def __call__(self, frame):
+        """Normalize the frame and fill the [N,3,S,S] batch buffer with its crops"""
+        self.normalize(frame)
+        self.normalized_at = time.perf_counter()
+        for i, view in enumerate(self.crops()):
+            np.copyto(self.batch[i], view)
+        return self.batch
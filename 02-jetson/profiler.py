@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+
+import numpy as np
+
+# --- CONFIGURATION ---
+WINDOW = 500        # last samples of each stage in the rolling percentiles
+TRACE_FRAMES = 100  # frames recorded in the Chrome trace
+PERCENTILES = (50, 95, 99)
+
+
+class StageProfiler:
+    """
+    Per-frame timing of the server stages, in the order they first run:
+      capture   - wait for the next camera / file frame
+      color     - BGR->RGB, uint8->float and normalization of the whole frame
+      crop      - copy of the crops (and tiles) into the batch buffer
+      upload, forward, output - the steps of the backend (Timings.STEPS)
+      escalate  - wait for the workers (--escalate)
+      jpeg      - preview encoding
+      serialize - wire message (and base64 with --wire json)
+      send      - ZMQ send
+    record() keeps the last WINDOW durations of each stage for the rolling
+    p50/p95/p99. With trace_path the spans of the first trace_frames
+    published frames are also written as a Chrome trace (chrome://tracing
+    or ui.perfetto.dev), one row per thread. With torch_path the same
+    frames are recorded by torch.profiler (operators, CUDA kernels).
+    Every duration also goes to `histogram` when set (metrics.Histogram
+    by stage).
+    """
+
+    def __init__(self, window=WINDOW, trace_path=None, trace_frames=TRACE_FRAMES, torch_path=None):
+        self.window = window
+        self.trace_path = trace_path
+        self.trace_frames = trace_frames
+        self.torch_path = torch_path
+        self._samples = {}
+        self._events = []
+        self._threads = {}
+        self._traced = 0
+        self._tracing = bool(trace_path or torch_path)
+        self._origin = time.perf_counter()
+        self._torch = None
+        self.histogram = None
+
+    def start(self):
+        if self.torch_path:
+            import torch
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._torch = torch.profiler.profile(activities=activities)
+            self._torch.start()
+        self._origin = time.perf_counter()
+        return self
+
+    def record(self, stage, start, end, seq=None):
+        """Duration of one stage of frame seq, from two time.perf_counter() values"""
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = deque(maxlen=self.window)
+        samples.append(end - start)
+        if self.histogram is not None:
+            self.histogram.observe(end - start, stage)
+        if self._tracing:
+            thread = threading.current_thread()
+            self._threads.setdefault(thread.ident, thread.name)
+            self._events.append({"name": stage, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                                 "ts": 1e6 * (start - self._origin), "dur": 1e6 * (end - start),
+                                 "args": {"seq": seq}})
+
+    def record_steps(self, timings, start, seq=None):
+        """Steps of the last Backend.infer() call, laid end to end from start"""
+        for step in timings.STEPS:
+            end = start + timings.last[step]
+            self.record(step, start, end, seq)
+            start = end
+
+    def frame_done(self):
+        """Called once per published frame: ends the traces after trace_frames frames"""
+        if not self._tracing:
+            return
+        self._traced += 1
+        if self._traced >= self.trace_frames:
+            self.dump()
+
+    def dump(self):
+        """Write the traces recorded so far and stop tracing"""
+        if not self._tracing:
+            return
+        self._tracing = False
+        if self._torch is not None:
+            self._torch.stop()
+            self._torch.export_chrome_trace(self.torch_path)
+            print(f"[Profile] torch.profiler trace of {self._traced} frames written to {self.torch_path}")
+        if self.trace_path:
+            names = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                     for tid, name in self._threads.items()]
+            with open(self.trace_path, "w") as f:
+                json.dump({"traceEvents": names + self._events, "displayTimeUnit": "ms"}, f)
+            print(f"[Profile] Chrome trace of {self._traced} frames written to {self.trace_path}")
+        self._events = []
+
+    def percentiles(self):
+        """{stage: (p50, p95, p99)} in ms over the last window samples"""
+        return {stage: tuple(np.percentile(1000.0 * np.array(list(samples)), PERCENTILES))
+                for stage, samples in list(self._samples.items()) if samples}
+
+    def format(self):
+        stats = self.percentiles()
+        if not stats:
+            return "no frame yet"
+        parts = " | ".join(f"{stage} {p50:.2f}/{p95:.2f}/{p99:.2f}" for stage, (p50, p95, p99) in stats.items())
+        return f"p50/p95/p99 ms: {parts}"
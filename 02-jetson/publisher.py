@@ -0,0 +1,141 @@
+import time
+
+import cv2
+import zmq
+
+import wire
+from metrics import PUBLISH_PERIOD
+
+# --- CONFIGURATION ---
+PREVIEW_FPS = 10.0
+PREVIEW_SCALE = 1.0
+PREVIEW_QUALITY = 50
+
+
+class ResultPublisher:
+    """
+    XPUB socket publishing the results on two topics:
+      - wire.TOPIC_CONTROL: header only (probabilities), every frame
+      - wire.TOPIC_PREVIEW: header + JPEG, at most preview_fps, resized by preview_scale
+    The subscriptions are read back from the XPUB socket, so the preview is
+    not even encoded while nobody (e.g. the web viewer) subscribes to it.
+
+    A multi-stream server passes stream= to publish each stream on its own
+    topics (wire.stream_topic), with its own preview rate.
+
+    With a StageProfiler in `profiler`, the message building (serialize)
+    and the ZMQ send of every message are recorded.
+
+    With --metrics-topic the server metrics are also published on
+    wire.TOPIC_METRICS, once per metrics.PUBLISH_PERIOD while subscribed.
+
+    With wire="json" every frame is sent as a legacy JSON payload with its
+    image and without topic, as the servers did before.
+    """
+
+    def __init__(self, context, port, crops_x, crop_size, wire_format="binary",
+                 preview_fps=PREVIEW_FPS, preview_scale=PREVIEW_SCALE, preview_quality=PREVIEW_QUALITY):
+        self.socket = context.socket(zmq.XPUB)
+        # Small send queue: slow subscribers drop frames instead of lagging
+        self.socket.setsockopt(zmq.SNDHWM, 2)
+        self.socket.bind(f"tcp://*:{port}")
+
+        self.crops_x = list(crops_x)
+        self.crop_size = crop_size
+        self.json = wire_format == "json"
+        self.preview_scale = preview_scale
+        self.set_preview(preview_fps, preview_quality)
+
+        self._topics = set()
+        self._next_preview = {}
+        self._next_metrics = 0.0
+        self.profiler = None
+        self.control_sent = 0
+        self.preview_sent = 0
+
+    def set_layout(self, crops_x, crop_size):
+        """Crop (or region) positions sent in the header of the next messages"""
+        self.crops_x = list(crops_x)
+        self.crop_size = crop_size
+
+    def set_preview(self, fps, quality):
+        """Max rate (0 = every frame) and JPEG quality of the next preview images"""
+        self.preview_period = 1.0 / fps if fps > 0 else 0.0
+        self.jpeg_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+
+    def _poll_subscriptions(self):
+        # Without XPUB_VERBOSE the socket reports the first subscription and
+        # the last unsubscription of each topic, which is exactly the set of
+        # topics that currently have at least one subscriber
+        while True:
+            try:
+                msg = self.socket.recv(zmq.NOBLOCK)
+            except zmq.Again:
+                return
+            if not msg:
+                continue
+            if msg[0] == 1:
+                self._topics.add(msg[1:])
+            else:
+                self._topics.discard(msg[1:])
+
+    def has_subscribers(self, topic):
+        self._poll_subscriptions()
+        return any(topic.startswith(t) for t in self._topics)
+
+    def preview_due(self, stream=None):
+        """True when a preview image should be encoded for the current frame"""
+        if self.json:
+            return True
+        if not self.has_subscribers(wire.stream_topic(wire.TOPIC_PREVIEW, stream)):
+            return False
+        return time.monotonic() >= self._next_preview.get(stream, 0.0)
+
+    def metrics_due(self):
+        if time.monotonic() < self._next_metrics:
+            return False
+        # Checked at most once per period, rendered only while subscribed
+        self._next_metrics = time.monotonic() + PUBLISH_PERIOD
+        return self.has_subscribers(wire.TOPIC_METRICS)
+
+    def send_metrics(self, text):
+        wire.send(self.socket, [wire.TOPIC_METRICS, text.encode()])
+
+    def encode_preview(self, image):
+        if self.preview_scale != 1.0:
+            image = cv2.resize(image, None, fx=self.preview_scale, fy=self.preview_scale,
+                               interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode('.jpg', image, self.jpeg_params)
+        return buffer
+
+    def send_control(self, seq, probs, fps, capture_ts, stream=None):
+        if self.json:
+            return
+        start = time.perf_counter()
+        frames = [wire.stream_topic(wire.TOPIC_CONTROL, stream)] + wire.encode(
+            seq, probs, self.crops_x, self.crop_size, fps, capture_ts)
+        self._send(seq, start, frames)
+        self.control_sent += 1
+
+    def send_preview(self, seq, probs, fps, capture_ts, jpeg, stream=None):
+        start = time.perf_counter()
+        if self.json:
+            frames = wire.encode_json(seq, probs, self.crops_x, self.crop_size, fps, capture_ts, jpeg)
+        else:
+            topic = wire.stream_topic(wire.TOPIC_PREVIEW, stream)
+            frames = [topic] + wire.encode(seq, probs, self.crops_x, self.crop_size, fps, capture_ts, jpeg)
+            self._next_preview[stream] = time.monotonic() + self.preview_period
+        self._send(seq, start, frames)
+        self.preview_sent += 1
+
+    def _send(self, seq, start, frames):
+        if self.profiler is None:
+            wire.send(self.socket, frames)
+            return
+        built = time.perf_counter()
+        wire.send(self.socket, frames)
+        self.profiler.record("serialize", start, built, seq)
+        self.profiler.record("send", built, time.perf_counter(), seq)
+
+    def close(self):
+        self.socket.close(linger=0)
@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+
+from geometry import window_offsets
+from preprocess import FramePreprocessor
+
+
+def parse_scales(text):
+    """Tile sizes from a comma separated option, e.g. "112" or "160,112" """
+    return [int(s) for s in text.split(",")] if text else []
+
+
+def tile_positions(size, frame_width, frame_height, stride=None):
+    """(x, y) of the size-pixel tiles covering the frame, one every stride pixels (default: no overlap)"""
+    xs = window_offsets(frame_width, size, stride=stride or size)
+    ys = window_offsets(frame_height, size, stride=stride or size)
+    return [(x, y) for y in ys for x in xs]
+
+
+class PyramidPreprocessor:
+    """
+    FramePreprocessor with extra, smaller-scale tiles for small or distant
+    targets. For each tile size t (e.g. 112px), the frame is resized once
+    by crop_size / t and the tiles are crop_size windows of the resized
+    frame, i.e. t-pixel tiles of the original frame upsampled to the model
+    input. The batch is [crops + tiles, 3, S, S], so the regular crops and
+    every scale go through the same forward passes.
+
+        batch = pyramid(image)        # fill the batch buffer
+        probs = pyramid.merge(out)    # one probability per regular crop
+
+    merge() gives each crop the max of its own probability and of the tiles
+    whose center lies inside it, so the published layout does not change.
+    """
+
+    def __init__(self, crops_x, scales, crop_size=224, frame_width=320, frame_height=224,
+                 stride=None, bgr=True, out=None):
+        self.crops_x = list(crops_x)
+        self.crop_size = crop_size
+        self.bgr = bgr
+
+        # (size, upscaled preprocessor, resized frame, [(x, y) in the original frame])
+        self.levels = []
+        for size in scales:
+            if size >= crop_size:
+                raise ValueError(f"pyramid tiles must be smaller than the {crop_size}px crops, got {size}px")
+            width = round(frame_width * crop_size / size)
+            height = round(frame_height * crop_size / size)
+            resized = np.empty((height, width, 3), dtype=np.uint8)
+            normalize = FramePreprocessor([], crop_size=height, frame_width=width, frame_height=height, bgr=bgr)
+            self.levels.append((size, normalize, resized,
+                                tile_positions(size, frame_width, frame_height, stride)))
+        self.n_tiles = sum(len(tiles) for *_, tiles in self.levels)
+
+        batch_shape = (len(self.crops_x) + self.n_tiles, 3, crop_size, crop_size)
+        if out is None:
+            out = np.empty(batch_shape, dtype=np.float32)
+        elif out.shape != batch_shape or out.dtype != np.float32:
+            raise ValueError(f"output buffer must be float32 {batch_shape}, got {out.dtype} {out.shape}")
+        self.batch = out
+        self._crops = FramePreprocessor(self.crops_x, crop_size, frame_width, frame_height, bgr,
+                                        out=out[:len(self.crops_x)])
+
+        # Batch rows of the tiles merged into each crop
+        self._members = [[] for _ in self.crops_x]
+        row = len(self.crops_x)
+        for size, _, _, tiles in self.levels:
+            for x, _ in tiles:
+                center = x + size / 2
+                for i, cx in enumerate(self.crops_x):
+                    if cx <= center < cx + crop_size:
+                        self._members[i].append(row)
+                row += 1
+
+    def __call__(self, frame):
+        """Normalize the frame, copy its crops, then the tiles of each scale"""
+        self._crops(frame)
+        row = len(self.crops_x)
+        s = self.crop_size
+        for size, normalize, resized, tiles in self.levels:
+            cv2.resize(frame, (resized.shape[1], resized.shape[0]), dst=resized, interpolation=cv2.INTER_LINEAR)
+            chw = normalize.normalize(resized)
+            scale = s / size
+            for x, y in tiles:
+                # Clamped so rounding never pushes a tile out of the resized frame
+                rx = min(round(x * scale), resized.shape[1] - s)
+                ry = min(round(y * scale), resized.shape[0] - s)
+                np.copyto(self.batch[row], chw[:, ry:ry + s, rx:rx + s])
+                row += 1
+        return self.batch
+
+    @property
+    def normalized_at(self):
+        return self._crops.normalized_at
+
+    def merge(self, probs):
+        """Probability of each regular crop, max over the crop and its tiles"""
+        probs = np.asarray(probs, dtype=np.float32)
+        merged = probs[:len(self.crops_x)].copy()
+        for i, rows in enumerate(self._members):
+            if rows:
+                merged[i] = max(merged[i], probs[rows].max())
+        return merged
+
+    def format(self, ms_per_crop=None):
+        """Tiles per scale and, with the backend timings, their estimated cost per frame"""
+        parts = []
+        for size, _, _, tiles in self.levels:
+            text = f"{size}px: {len(tiles)} tiles"
+            if ms_per_crop is not None:
+                text += f" ~{ms_per_crop * len(tiles):.2f}ms"
+            parts.append(text)
+        return f"{len(self.crops_x)} crops + " + " | ".join(parts)
@@ -0,0 +1,148 @@
+import os
+import time
+import threading
+
+import numpy as np
+import zmq
+
+# --- CONFIGURATION ---
+WATCH_PERIOD = 1.0  # seconds between two checks of the model file
+RELOAD_PORT = 5556
+
+
+class ModelReloader:
+    """
+    Load a new model while the server keeps running on the current one.
+
+    A reload is triggered when the watched model file changes (watch=True)
+    or by a request on a ZMQ REP socket (port): an empty request reloads
+    the current path, otherwise the request is the path of the new model.
+    The new backend is loaded, warmed up at the real batch shape and
+    validated on a background thread. The inference stage then calls
+    swap(backend) between two frames, which returns the new backend once
+    it is ready (or the current one). If loading or validation fails the
+    server keeps the current model.
+    """
+
+    def __init__(self, load, batch_shape, n_outputs, model_path, watch=False, port=0, context=None):
+        self.load = load
+        self.batch_shape = batch_shape
+        self.n_outputs = n_outputs
+        self.model_path = model_path
+        self.watch = watch
+        self.port = port
+        self.context = context or zmq.Context.instance()
+
+        self._pending = None
+        self._lock = threading.Lock()
+        # (path, mtime, size) of the model running, updated by swap(): the
+        # file watch only reloads a file that differs from it
+        self.stamp = self._stamp()
+        self._loading = threading.Lock()  # one reload at a time (file watch and requests)
+        self._stop = threading.Event()
+        self._threads = []
+        self.swaps = 0
+        self.failures = 0
+
+    def start(self):
+        if self.watch:
+            self._threads.append(threading.Thread(target=self._watch_main, daemon=True))
+        if self.port:
+            self._threads.append(threading.Thread(target=self._command_main, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def reload(self, path=None):
+        """Load, warm up and validate a model, then queue it for swap(). Returns (ok, message)."""
+        path = path or self.model_path
+        with self._loading:
+            start = time.perf_counter()
+            print(f"[Reload] Loading {path} in the background...")
+            stamp = self._stamp(path)
+            try:
+                backend = self.load(path)
+                backend.warmup(self.batch_shape)
+                self._validate(backend)
+            except Exception as e:
+                self.failures += 1
+                print(f"[Reload] {path} rejected, keeping the current model: {e}")
+                return False, f"error: {e}"
+            backend.timings.reset()
+            load_time = time.perf_counter() - start
+            with self._lock:
+                self._pending = (backend, path, stamp, load_time)
+        return True, f"ok: {path} loaded in {load_time:.1f}s"
+
+    def _validate(self, backend):
+        buffer = backend.allocate(self.batch_shape)
+        buffer.array[:] = 0.0
+        probs = np.asarray(backend.infer(buffer))
+        if probs.shape != (self.n_outputs,):
+            raise ValueError(f"{probs.shape[0] if probs.ndim else 0} outputs instead of {self.n_outputs}")
+        if not (np.isfinite(probs).all() and (probs >= 0).all() and (probs <= 1).all()):
+            raise ValueError(f"invalid probabilities {probs}")
+
+    def swap(self, current):
+        """The backend to run the next frame with: the new one once it is ready, else current"""
+        if self._pending is None:
+            return current
+        with self._lock:
+            backend, path, stamp, load_time = self._pending
+            self._pending = None
+            self.model_path, self.stamp = path, stamp
+        # Knobs set at runtime (e.g. by the latency governor) carry over
+        backend.input_size = current.input_size
+        self.swaps += 1
+        print(f"[Reload] Swapping to {path} (loaded and warmed up in {load_time:.1f}s)")
+        return backend
+
+    # --- TRIGGERS ---
+    def _stamp(self, path=None):
+        path = path or self.model_path
+        try:
+            stat = os.stat(path)
+            return path, stat.st_mtime, stat.st_size
+        except OSError:
+            return None
+
+    def _watched(self):
+        """Stamp of the model file now and of the model running (path swapped in, stamped when it was loaded)"""
+        with self._lock:
+            return self._stamp(), self.stamp
+
+    def _watch_main(self):
+        handled = None  # last file reloaded (waiting for its swap, or rejected): not retried until it changes
+        while not self._stop.wait(WATCH_PERIOD):
+            current, running = self._watched()
+            if current is None or current in (running, handled):
+                continue
+            # Wait for the file to stop changing (copy in progress)
+            while not self._stop.wait(WATCH_PERIOD):
+                latest = self._stamp(current[0])
+                if latest == current:
+                    break
+                current = latest
+            if current is None or self._stop.is_set():
+                continue
+            handled = current
+            self.reload(current[0])
+
+    def _command_main(self):
+        socket = self.context.socket(zmq.REP)
+        socket.bind(f"tcp://*:{self.port}")
+        print(f"[Reload] Waiting for reload requests on port {self.port}")
+        try:
+            while not self._stop.is_set():
+                if not socket.poll(500):
+                    continue
+                path = socket.recv().decode().strip()
+                _, message = self.reload(path or None)
+                socket.send_string(message)
+        finally:
+            socket.close(linger=0)
+
+    def close(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
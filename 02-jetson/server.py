@@ -0,0 +1,590 @@
+import time
+import argparse
+import threading
+from collections import deque
+
+import zmq
+
+from backends import BACKENDS, DEVICES, create_backend, import_backend
+import cascade
+import multistream
+import workers
+from motion import MotionGate, THRESHOLD, MAX_SKIP_AGE
+import tracking
+from tracking import CropScheduler
+from governor import LatencyGovernor, CropRotation
+from reload import ModelReloader
+from profiler import StageProfiler, TRACE_FRAMES
+from metrics import MetricsRegistry, serve_http
+from startup import StartupTimer
+from geometry import parse_layout
+from preprocess import FramePreprocessor
+from pyramid import PyramidPreprocessor, parse_scales, tile_positions
+from pipeline import Pipeline, BufferPool, run_sequential
+from wire import WIRE_FORMATS
+from publisher import ResultPublisher, PREVIEW_FPS, PREVIEW_SCALE, PREVIEW_QUALITY
+from frame_ring import CaptureProcess
+from sources import PACES, Frame, open_source
+
+# --- CONFIGURATION ---
+ZMQ_PORT = 5555
+CAM_WIDTH = 320
+CAM_HEIGHT = 224
+MODEL_INPUT_SIZE = 224
+REPORT_EVERY = 5.0  # seconds between two backend timing reports
+FPS_WINDOW = 1.0    # seconds of inferred frames averaged in the published FPS
+
+
+def build_parser(description='Vision Server'):
+    parser = argparse.ArgumentParser(description=description)
+    # Model
+    parser.add_argument('--backend', type=str, default='torch', choices=BACKENDS, help='Inference backend (default: torch)')
+    parser.add_argument('--model', type=str, default='', help='PyTorch checkpoint (torch), .onnx file (onnx, opencv) or converted engine (trt)')
+    parser.add_argument('--arch', type=str, default='mobilenet_v2', help='Architecture of the checkpoint, torch backend only (default: mobilenet_v2)')
+    parser.add_argument('--device', type=str, default='auto', choices=DEVICES, help='auto = cuda for torch/trt if available, cpu for onnx/opencv')
+    parser.add_argument('--batch-size', type=int, default=0, help='Crops per forward pass, 0 = all crops in one pass, 1 = one pass per crop (default: 0)')
+    parser.add_argument('--spatial', type=str, default=None, choices=['zones', 'columns'], help='torch backend: run the backbone once on the whole frame, then the classifier per crop zone or per feature map column')
+    parser.add_argument('--cascade', action='store_true', help='Score every crop with a small gate model, and only the uncertain ones with --model')
+    parser.add_argument('--cascade-backend', type=str, default=None, choices=BACKENDS, help='Backend of the gate model (default: same as --backend)')
+    parser.add_argument('--cascade-model', type=str, default='', help='Checkpoint / .onnx / engine of the gate model')
+    parser.add_argument('--cascade-arch', type=str, default=cascade.GATE_ARCH, help=f'Architecture of the gate checkpoint, torch backend only (default: {cascade.GATE_ARCH})')
+    parser.add_argument('--cascade-size', type=int, default=0, help=f'Input resolution of the gate model (default: the input size of an onnx/trt gate, else {cascade.GATE_SIZE})')
+    parser.add_argument('--cascade-band', type=str, default=','.join(map(str, cascade.BAND)), help='Gate probabilities re-scored by the big model, "low,high" (default: 0.2,0.8)')
+    # Input and crop layout
+    parser.add_argument('--streams', type=str, default='', help='Multi-stream mode: comma separated inputs served by one model, published on ctrl/<i> and prev/<i>')
+    parser.add_argument('--max-batch', type=int, default=0, help='Multi-stream mode: max crops per batch, 0 = the crops of every stream (default: 0)')
+    parser.add_argument('--max-wait', type=float, default=multistream.MAX_WAIT, help=f'Multi-stream mode: max ms a batch waits for other streams (default: {multistream.MAX_WAIT})')
+    parser.add_argument('--input', type=str, default='csi', help='"csi" (Jetson camera), webcam ID (0 or /dev/video0), video file (demo.mp4) or image directory (../data/cible)')
+    parser.add_argument('--pace', type=str, default='realtime', choices=PACES, help='Video files / image directories: play at their frame rate (realtime) or as fast as possible (max)')
+    parser.add_argument('--mirror', action='store_true', help='Activate mirror mode for webcam')
+    parser.add_argument('--width', type=int, default=CAM_WIDTH, help=f'Frame width (default: {CAM_WIDTH})')
+    parser.add_argument('--height', type=int, default=CAM_HEIGHT, help=f'Frame height (default: {CAM_HEIGHT})')
+    parser.add_argument('--crop-size', type=int, default=MODEL_INPUT_SIZE, help=f'Model input resolution (default: {MODEL_INPUT_SIZE})')
+    parser.add_argument('--crops', type=str, default='', help='Comma separated x offsets of the crops (default: left/center/right zones 0,48,96)')
+    parser.add_argument('--windows', type=int, default=0, help='Instead of --crops: N windows evenly spread across the frame (3 = the standard zones)')
+    parser.add_argument('--stride', type=int, default=0, help='Instead of --crops: one window every STRIDE pixels')
+    parser.add_argument('--pyramid', type=str, default='', help='Comma separated sizes of smaller tiles upsampled to the model input and merged into the crops, e.g. 112 (default: none)')
+    parser.add_argument('--pyramid-stride', type=int, default=0, help='Pixels between two pyramid tiles, 0 = tile size (no overlap)')
+    # Execution
+    parser.add_argument('--pipelined', action='store_true', help='Run capture / preprocess / infer / publish in parallel threads')
+    parser.add_argument('--queue-size', type=int, default=1, help='Depth of the drop-oldest queues between stages (default: 1)')
+    parser.add_argument('--capture-process', action='store_true', help='Grab frames in a separate process through a shared-memory ring buffer')
+    parser.add_argument('--motion-gate', action='store_true', help='Skip the inference of the crops that did not change since they were last inferred')
+    parser.add_argument('--motion-threshold', type=float, default=THRESHOLD, help=f'Mean gray level change (0-255) above which a crop is inferred again (default: {THRESHOLD})')
+    parser.add_argument('--max-skip-age', type=int, default=MAX_SKIP_AGE, help=f'Infer every crop at least once every N frames with --motion-gate (default: {MAX_SKIP_AGE})')
+    parser.add_argument('--track', action='store_true', help='Only infer the windows around the last target position, with a full scan when it is lost (needs more windows than --track-windows, e.g. --windows 7)')
+    parser.add_argument('--track-windows', type=int, default=tracking.TRACK_WINDOWS, help=f'Windows inferred around the target with --track (default: {tracking.TRACK_WINDOWS})')
+    parser.add_argument('--track-threshold', type=float, default=tracking.THRESHOLD, help=f'Target probability below which --track falls back to a full scan (default: {tracking.THRESHOLD})')
+    parser.add_argument('--full-scan-every', type=int, default=tracking.FULL_SCAN_EVERY, help=f'Full scan at least every N frames with --track (default: {tracking.FULL_SCAN_EVERY})')
+    parser.add_argument('--budget', type=float, default=0, help='Latency budget in ms: degrade preview, resolution and crops while the p95 capture->publish latency is over it, 0 = off (default: 0)')
+    parser.add_argument('--watch-model', action='store_true', help='Reload --model in the background when the file changes, and swap it in between two frames')
+    parser.add_argument('--reload-port', type=int, default=0, help='ZMQ REP port taking reload requests (new model path, or empty for --model), 0 = off (default: 0)')
+    parser.add_argument('--profile', action='store_true', help='Time every stage of every frame and report their rolling p50/p95/p99')
+    parser.add_argument('--trace', type=str, default='', help='Write a Chrome trace of the stages of the first --trace-frames frames to this .json file (implies --profile)')
+    parser.add_argument('--torch-trace', type=str, default='', help='Also record the first --trace-frames frames with torch.profiler into this .json file (torch/trt backends)')
+    parser.add_argument('--trace-frames', type=int, default=TRACE_FRAMES, help=f'Frames recorded by --trace / --torch-trace (default: {TRACE_FRAMES})')
+    parser.add_argument('--metrics-port', type=int, default=0, help='Serve Prometheus metrics on http://<host>:PORT/metrics, 0 = off (default: 0)')
+    parser.add_argument('--metrics-topic', action='store_true', help='Publish the Prometheus metrics on the "metrics" topic of --port, once per second while subscribed')
+    parser.add_argument('--report-startup', action='store_true', help='Print the startup timeline (imports, camera, model, warmup) up to the first published result')
+    parser.add_argument('--frames', type=int, default=0, help='Stop after this many published frames and print a summary, 0 = run forever (default: 0)')
+    parser.add_argument('--workers', action='store_true', help='Send the preprocessed crops to a pool of inference workers (05-inference_worker.py) instead of a local model')
+    parser.add_argument('--escalate', action='store_true', help='Send the frames with an ambiguous crop to remote workers running a bigger model, and use their answer if it is back within --deadline (needs --pipelined)')
+    parser.add_argument('--escalate-band', type=str, default='0.3,0.7', help='--escalate: crop probabilities considered ambiguous, "low,high" (default: 0.3,0.7)')
+    parser.add_argument('--task-port', type=int, default=workers.TASK_PORT, help=f'--workers / --escalate: port the workers pull the tasks from (default: {workers.TASK_PORT})')
+    parser.add_argument('--result-port', type=int, default=workers.RESULT_PORT, help=f'--workers / --escalate: port the workers push the results to (default: {workers.RESULT_PORT})')
+    parser.add_argument('--deadline', type=float, default=workers.DEADLINE, help=f'--workers / --escalate: ms before a frame sent to the workers is given up (default: {workers.DEADLINE})')
+    # Output
+    parser.add_argument('--port', type=int, default=ZMQ_PORT, help=f'ZMQ publisher port (default: {ZMQ_PORT})')
+    parser.add_argument('--wire', type=str, default='binary', choices=WIRE_FORMATS, help='Message format: binary multipart (default) or legacy JSON with base64 image')
+    parser.add_argument('--preview-fps', type=float, default=PREVIEW_FPS, help=f'Max rate of the preview images for the viewer, 0 = every frame (default: {PREVIEW_FPS})')
+    parser.add_argument('--preview-scale', type=float, default=PREVIEW_SCALE, help='Resize factor of the preview images (default: 1.0)')
+    parser.add_argument('--preview-quality', type=int, default=PREVIEW_QUALITY, help=f'JPEG quality of the preview images (default: {PREVIEW_QUALITY})')
+    return parser
+
+
+def main(argv=None, description='Vision Server'):
+    startup = StartupTimer()
+    startup.add("interpreter + server imports", 0.0, startup.now())
+    args = build_parser(description).parse_args(argv)
+    # The metrics include the stage histograms of the profiler
+    args.profile = args.profile or bool(args.trace or args.torch_trace or args.metrics_port or args.metrics_topic)
+    if args.profile and (args.streams or args.workers):
+        print("[Error] --profile, --metrics-* and the traces are only available in the single-stream server.")
+        return
+    if args.streams:
+        if args.spatial or args.pyramid or args.motion_gate or args.track or args.cascade or args.budget \
+                or args.capture_process or args.pipelined or args.wire != 'binary':
+            print("[Error] The multi-stream mode runs the plain crops with the binary wire format only.")
+            return
+        multistream.run(args, args.streams.split(","))
+        return
+    if args.workers:
+        if args.spatial or args.pyramid or args.motion_gate or args.track or args.cascade or args.budget \
+                or args.capture_process or args.pipelined:
+            print("[Error] The worker pool mode runs the plain crops only.")
+            return
+        workers.run(args)
+        return
+    crops_offsets = parse_layout(args.crops, args.windows, args.stride, args.width, args.crop_size)
+    print(f"[Init] {len(crops_offsets)} crops of {args.crop_size}px at x={crops_offsets}")
+    scales = parse_scales(args.pyramid)
+    n_tiles = sum(len(tile_positions(size, args.width, args.height, args.pyramid_stride)) for size in scales)
+    if scales:
+        print(f"[Init] Pyramid: {n_tiles} tiles of {args.pyramid}px merged into the crops")
+    frame_shape = (args.height, args.width, 3)
+    if args.track and args.motion_gate:
+        print("[Error] --track and --motion-gate can't be combined.")
+        return
+    if args.track and args.track_windows >= len(crops_offsets):
+        # Every window would be inferred on every frame: nothing saved
+        print(f"[Error] --track infers {args.track_windows} windows around the target out of {len(crops_offsets)}, "
+              f"use a finer layout (e.g. --windows 7) or fewer --track-windows.")
+        return
+    if scales and (args.spatial or args.motion_gate or args.track):
+        print("[Error] --pyramid can't be combined with --spatial, --motion-gate or --track.")
+        return
+    if args.escalate and (scales or args.spatial):
+        print("[Error] --escalate can't be combined with --pyramid or --spatial.")
+        return
+    if args.escalate and not args.pipelined:
+        # Sequential stages: waiting for the workers would stall capture and publish up to --deadline
+        print("[Error] --escalate needs --pipelined.")
+        return
+    if args.spatial and (args.backend != 'torch' or args.motion_gate or args.track or args.cascade):
+        print("[Error] --spatial needs the torch backend and no --motion-gate, --track or --cascade.")
+        return
+
+    # 1. Setup ZMQ
+    # Control topic: probabilities of every frame (controllers)
+    # Preview topic: decimated JPEG images, only encoded while the viewer is subscribed
+    context = zmq.Context()
+    publisher = ResultPublisher(context, args.port, crops_offsets, args.crop_size, args.wire,
+                                args.preview_fps, args.preview_scale, args.preview_quality)
+    print(f"[Comms] ZMQ Publisher bound to port {args.port}")
+
+    # 2. Load Model (background thread, while the camera opens)
+    def load_backend(model_path):
+        """Backend running model_path with the server options, also used to reload the model (not the gate)"""
+        if args.spatial:
+            from spatial import SpatialBackend
+            if args.spatial == 'zones':
+                return SpatialBackend(model_path, args.arch, args.device, args.width, args.height, crops_offsets, args.crop_size)
+            return SpatialBackend(model_path, args.arch, args.device, args.width, args.height)
+        return create_backend(args.backend, model_path, arch=args.arch, device=args.device,
+                              batch_size=args.batch_size or None)
+
+    loaded = {}
+
+    def load_model():
+        # Library import (most of a cold start), model, then a warmup at the real batch shape
+        try:
+            print(f"[Model] Loading {args.model or args.arch} with the {args.backend} backend...")
+            with startup.phase(f"import {args.backend}"):
+                import_backend(args.backend)
+                if args.cascade:
+                    import_backend(args.cascade_backend or args.backend)
+            with startup.phase("model load"):
+                if args.cascade:
+                    gate_model = create_backend(args.cascade_backend or args.backend, args.cascade_model,
+                                                arch=args.cascade_arch, device=args.device,
+                                                batch_size=args.batch_size or None)
+                    fixed = gate_model.model_size
+                    if fixed and args.cascade_size and args.cascade_size != fixed:
+                        loaded["invalid"] = (f"--cascade-size {args.cascade_size} but the gate model only "
+                                             f"runs {fixed}px inputs")
+                        return
+                    args.cascade_size = args.cascade_size or fixed or cascade.GATE_SIZE
+                backend = load_backend(args.model)
+                if args.cascade:
+                    backend = cascade.CascadeBackend(gate_model, backend, args.cascade_size,
+                                                     cascade.parse_band(args.cascade_band))
+            if args.spatial:
+                batch_shape = backend.input_shape
+            else:
+                batch_shape = (len(crops_offsets) + n_tiles, 3, args.crop_size, args.crop_size)
+            with startup.phase(f"warmup {list(batch_shape)}"):
+                backend.warmup(batch_shape)
+            loaded["backend"], loaded["batch_shape"] = backend, batch_shape
+        except Exception as e:
+            loaded["error"] = e
+
+    loader = threading.Thread(target=load_model, name="loader", daemon=True)
+
+    # 3. Setup Input Source (CSI camera, webcam, video file or image directory)
+    # The capture process must be forked before CUDA is initialized (model loading)
+    grabber = None
+    source = None
+    print(f"[Camera] Opening {args.input} ({args.pace})...")
+    source_args = (args.input, args.width, args.height, args.mirror, args.pace)
+    try:
+        if args.capture_process:
+            print("[Camera] Reading frames in a capture process...")
+            with startup.phase("capture process start"):
+                grabber = CaptureProcess(frame_shape, open_source, source_args).start()
+            loader.start()
+        else:
+            loader.start()
+            with startup.phase("camera open"):
+                source = open_source(*source_args)
+    except Exception as e:
+        print(f"[Error] Could not open video source: {e}")
+        return
+    print("[Camera] Ready.")
+
+    loader.join()
+    if "error" in loaded or "invalid" in loaded:
+        if grabber is not None:
+            grabber.stop()
+        else:
+            source.close()
+        if "invalid" in loaded:
+            print(f"[Error] {loaded['invalid']}")
+            publisher.close()
+            return
+        raise loaded["error"]
+    backend, batch_shape = loaded["backend"], loaded["batch_shape"]
+    if args.spatial:
+        # One probability per region instead of per crop
+        publisher.set_layout(backend.regions_x, backend.region_size)
+    print(f"[Model] Ready: {backend.describe()}")
+    reloader = None
+    if args.watch_model or args.reload_port:
+        n_outputs = len(backend.regions_x) if args.spatial else batch_shape[0]
+        reloader = ModelReloader(load_backend, batch_shape, n_outputs, args.model,
+                                 args.watch_model, args.reload_port, context).start()
+
+    # Preallocated buffers, reused from frame to frame. In pipelined mode one
+    # is being filled, up to queue_size are waiting and one is being inferred.
+    n_buffers = args.queue_size + 2 if args.pipelined else 1
+    slots = []
+    for _ in range(n_buffers):
+        batch = backend.allocate(batch_shape)
+        if args.spatial:
+            # The whole normalized frame is the model input, no crop copies
+            preprocess = FramePreprocessor([], crop_size=args.height, frame_width=args.width,
+                                           frame_height=args.height, bgr=True, frame_out=batch.array[0])
+        elif scales:
+            # Crops and tiles of every scale in the same batch
+            preprocess = PyramidPreprocessor(crops_offsets, scales, crop_size=args.crop_size, frame_width=args.width,
+                                             frame_height=args.height, stride=args.pyramid_stride or None,
+                                             bgr=True, out=batch.array)
+        else:
+            preprocess = FramePreprocessor(crops_offsets, crop_size=args.crop_size,
+                                           frame_width=args.width, frame_height=args.height, bgr=True, out=batch.array)
+        slots.append((preprocess, batch))
+    pool = BufferPool(slots)
+    gate = None
+    if args.motion_gate:
+        gate = MotionGate(crops_offsets, args.crop_size, args.motion_threshold, args.max_skip_age)
+        print(f"[Model] Motion gate: threshold {args.motion_threshold}, max skip age {args.max_skip_age} frames")
+    elif args.track:
+        # Same select/update interface as the motion gate
+        gate = CropScheduler(crops_offsets, args.crop_size, args.track_windows, args.track_threshold, args.full_scan_every)
+        print(f"[Model] Tracking: {args.track_windows} windows around the target, full scan below "
+              f"{args.track_threshold} or every {args.full_scan_every} frames")
+    # --- LATENCY GOVERNOR ---
+    governor = None
+    rotation = None
+    if args.budget > 0:
+        nominal = {"preview_fps": args.preview_fps, "preview_quality": args.preview_quality}
+        if backend.resizable:
+            nominal["input_size"] = args.crop_size
+        if gate is None and not scales and not args.spatial:
+            # Fewer crops per frame, in turn, when every other knob is exhausted
+            rotation = CropRotation(len(crops_offsets))
+            nominal["crop_every"] = 1
+
+        def apply(settings):
+            publisher.set_preview(settings["preview_fps"], settings["preview_quality"])
+            if "input_size" in settings:
+                backend.input_size = settings["input_size"]
+            if rotation is not None:
+                rotation.every = settings["crop_every"]
+
+        governor = LatencyGovernor(args.budget, apply, nominal)
+        print(f"[Governor] Budget {args.budget:.0f}ms (p95), ladder: " + ", ".join(f"{k} {v}" for k, v in governor.ladder))
+    # --- ESCALATION TO REMOTE WORKERS ---
+    remote = None
+    if args.escalate:
+        band = cascade.parse_band(args.escalate_band)
+        remote = workers.WorkerPool(context, args.task_port, args.result_port, args.deadline)
+        waiting = set()   # frames sent to the workers, answered in the escalate stage
+        answers = {}
+        inferred = 0
+        print(f"[Comms] Escalating ambiguous frames ({band[0]} <= p <= {band[1]}) to the workers on ports "
+              f"{args.task_port}/{args.result_port}, deadline {args.deadline:.0f}ms")
+
+    # --- PROFILING ---
+    profiler = None
+    if args.profile:
+        profiler = StageProfiler(trace_path=args.trace or None, trace_frames=args.trace_frames,
+                                 torch_path=args.torch_trace or None)
+        publisher.profiler = profiler
+        if args.trace or args.torch_trace:
+            print(f"[Profile] Tracing the first {args.trace_frames} frames")
+
+    last_report = time.time()
+    first_frame = True
+    inferred_times = deque()
+    last_seq = -1
+    first_seq = newest_seq = None
+    published = 0
+    latency_sum = 0.0
+    start_time = end_time = None
+
+    # --- METRICS ---
+    # Read from the existing counters when scraped, only the stage
+    # histograms are updated per frame (by the profiler)
+    registry = None
+    metrics_server = None
+    if args.metrics_port or args.metrics_topic:
+        registry = MetricsRegistry()
+        registry.counter("vision_frames_published_total", "Frames inferred and published",
+                         fn=lambda: published)
+        registry.counter("vision_frames_dropped_total", "Source frames never published (camera gaps, drop-oldest queues)",
+                         fn=lambda: newest_seq - first_seq + 1 - published if published else 0)
+        registry.gauge("vision_fps", "Inferred frames per second over the last second",
+                       fn=lambda: round(len(inferred_times) / FPS_WINDOW, 1))
+        registry.info("vision_model", "Model and backend",
+                      fn=lambda: {"backend": backend.name, "device": backend.device, "model": args.model or args.arch})
+        registry.info("vision_resolution", "Frame and crop layout",
+                      fn=lambda: {"width": args.width, "height": args.height, "crops": len(crops_offsets)})
+        registry.gauge("vision_input_size_pixels", "Model input resolution (lowered by --budget)",
+                       fn=lambda: backend.input_size or args.crop_size)
+        profiler.histogram = registry.histogram("vision_stage_seconds", "Duration of each stage of a frame",
+                                                label="stage")
+        if args.metrics_port:
+            metrics_server = serve_http(registry, args.metrics_port)
+
+    def report():
+        print(f"[Backend] {backend.name}: {backend.timings.format()}")
+        if args.cascade:
+            print(f"[Cascade] {backend.format()}")
+        if args.track:
+            print(f"[Track] {gate.format()}")
+        elif gate is not None:
+            print(f"[Gate] {gate.format(backend.timings.ms_per_crop())}")
+        if scales:
+            print(f"[Pyramid] {slots[0][0].format(backend.timings.ms_per_crop())}")
+        if governor is not None:
+            print(f"[Governor] {governor.format()}")
+        if profiler is not None:
+            print(f"[Profile] {profiler.format()}")
+        if remote is not None:
+            print(f"[Escalate] {remote.submitted}/{inferred} frames escalated "
+                  f"({100.0 * remote.submitted / max(inferred, 1):.1f}%) | {remote.format()}")
+
+    # --- STAGES ---
+    def capture():
+        nonlocal last_seq, first_frame
+        if args.frames and published >= args.frames:
+            return None
+        start = time.perf_counter()
+        if grabber is None:
+            frame = source.read()
+        else:
+            # Zero-copy view of the newest frame in the shared-memory ring
+            frame = grabber.read(last_seq)
+            if frame is None:
+                print("[Error] Capture process ended.")
+                return None
+            last_seq = frame[0]
+            frame = Frame(*frame)
+        if profiler is not None and frame is not None:
+            profiler.record("capture", start, time.perf_counter(), frame.seq)
+        if first_frame and frame is not None:
+            first_frame = False
+            startup.mark("first frame captured")
+        return frame
+
+    def prepare(frame):
+        # BGR->RGB and normalization are done once on the whole frame,
+        # then the crops are copied into the [N,3,S,S] batch buffer
+        seq, timestamp, image = frame
+        slot = pool.acquire()
+        preprocess, _ = slot
+        start = time.perf_counter()
+        preprocess(image)
+        if profiler is not None:
+            profiler.record("color", start, preprocess.normalized_at, seq)
+            profiler.record("crop", preprocess.normalized_at, time.perf_counter(), seq)
+        if grabber is not None and not grabber.ring.is_valid(seq):
+            # The capture process lapped the ring while we were reading
+            pool.release(slot)
+            return None
+        return seq, timestamp, image, slot
+
+    def infer(item):
+        nonlocal last_report, backend, inferred
+        seq, timestamp, image, slot = item
+
+        # New model ready: swapped between two frames. With --cascade only
+        # the big model is reloaded, the gate keeps running. The slots stay
+        # those of the first backend: an onnx backend copies them into its
+        # own bound input (one batch copy per frame) after a reload.
+        swap_time = None
+        if reloader is not None:
+            live = backend.big if args.cascade else backend
+            current = reloader.swap(live)
+            if current is not live:
+                old_ms = backend.timings.mean_ms()
+                # The pause is only this reference swap, the model is already warm
+                swap_start = time.perf_counter()
+                if args.cascade:
+                    backend.big = current
+                else:
+                    backend = current
+                swap_time = time.perf_counter() - swap_start
+
+        # All the crops in as few forward passes as --batch-size allows,
+        # then a single softmax and a single device->host transfer.
+        # WARNING: If your model outputs [NoTarget, Target], change TARGET_INDEX in labels.py
+        sampler = gate
+        if sampler is None and rotation is not None and rotation.every > 1:
+            sampler = rotation
+        infer_start = time.perf_counter()
+        if sampler is None:
+            probs = backend.infer(slot[1])
+            if scales:
+                # Tiles merged into their crops, the published layout is unchanged
+                probs = slot[0].merge(probs)
+            if rotation is not None:
+                # Kept by the crops the rotation skips once the governor starts it
+                rotation.seed(probs)
+        else:
+            # Only the crops that changed (or near the target with --track),
+            # the others keep their last probability
+            select = sampler.select(image)
+            infer_start = time.perf_counter()
+            probs = sampler.update(select, backend.infer(slot[1], select) if select else [])
+        if profiler is not None and (sampler is None or select):
+            profiler.record_steps(backend.timings, infer_start, seq)
+        if remote is not None:
+            inferred += 1
+            # Ambiguous frame: its crops go to the workers before the buffer is reused
+            if any(band[0] <= p <= band[1] for p in probs) and remote.submit(seq, slot[1].array, probs):
+                waiting.add(seq)
+        pool.release(slot)
+        if swap_time is not None:
+            # First frame on the new model against the usual inference time on the old one
+            print(f"[Reload] Swap pause {1e6 * swap_time:.1f}us, first frame on the new model "
+                  f"{1000.0 * sum(backend.timings.last.values()):.2f}ms "
+                  f"(old model: {sum(old_ms.values()):.2f}ms)")
+
+        # --- FPS CALC ---
+        # Sources never return the same frame twice, so this is the rate of
+        # distinct camera frames inferred over the last FPS_WINDOW seconds
+        curr_time = time.time()
+        if not inferred_times:
+            startup.mark("first frame inferred")
+        inferred_times.append(curr_time)
+        while curr_time - inferred_times[0] > FPS_WINDOW:
+            inferred_times.popleft()
+        span = curr_time - inferred_times[0]
+        fps = (len(inferred_times) - 1) / span if span > 0 else 0.0
+        if curr_time - last_report >= REPORT_EVERY:
+            report()
+            last_report = curr_time
+        return seq, timestamp, image, probs, fps
+
+    def escalate(item):
+        # Wait for the answer of the workers (or the deadline) of an escalated
+        # frame: the remote probabilities replace the local ones if they are in time
+        seq, timestamp, image, probs, fps = item
+        # Frames escalated in infer then dropped between the stages (copied:
+        # the infer stage adds to the set)
+        waiting.difference_update([s for s in list(waiting) if s < seq])
+        if seq not in waiting:
+            return item
+        waiting.discard(seq)
+        start = time.perf_counter()
+        while seq not in answers:
+            # Deadline misses (local probabilities kept) are counted by the pool
+            for answer_seq, answer, _ in remote.poll(5):
+                answers[answer_seq] = answer
+        answer = answers.pop(seq)
+        # Answers of frames dropped between the stages
+        for stale in [s for s in answers if s < seq]:
+            del answers[stale]
+        if profiler is not None:
+            profiler.record("escalate", start, time.perf_counter(), seq)
+        return seq, timestamp, image, answer, fps
+
+    def publish(item):
+        nonlocal published, latency_sum, start_time, end_time, first_seq, newest_seq
+        if args.frames and published >= args.frames:
+            # Pipelined: frames captured before the count was reached, still in the stages
+            return None
+        seq, timestamp, image, probs, fps = item
+
+        publisher.send_control(seq, probs, fps, timestamp)
+        if publisher.preview_due():
+            encode_start = time.perf_counter()
+            buffer = publisher.encode_preview(image)
+            if profiler is not None:
+                profiler.record("jpeg", encode_start, time.perf_counter(), seq)
+            # Frame overwritten during encoding: don't publish a torn image
+            if grabber is None or grabber.ring.is_valid(seq):
+                publisher.send_preview(seq, probs, fps, timestamp, buffer)
+
+        # --- SUMMARY (--frames) ---
+        if start_time is None:
+            start_time = time.time()
+            first_seq = seq
+            startup.mark("first result published")
+            if args.report_startup:
+                print(f"[Startup] Time to first published result: {startup.now():.2f}s after the process start")
+                for line in startup.format():
+                    print(f"[Startup]   {line}")
+        newest_seq = seq if newest_seq is None else max(newest_seq, seq)
+        end_time = time.time()
+        published += 1
+        latency_sum += end_time - timestamp
+        if governor is not None:
+            governor.observe(end_time - timestamp)
+        if profiler is not None:
+            profiler.frame_done()
+        if args.metrics_topic and publisher.metrics_due():
+            publisher.send_metrics(registry.render())
+        return seq
+
+    stages = [
+        ("capture", capture),
+        ("preprocess", prepare, lambda item: pool.release(item[3])),
+        ("infer", infer),
+        ("publish", publish),
+    ]
+    if remote is not None:
+        stages.insert(3, ("escalate", escalate))
+
+    try:
+        if profiler is not None:
+            profiler.start()
+        if args.pipelined:
+            print(f"[System] Starting Pipelined Inference Loop (queue size {args.queue_size})...")
+            Pipeline(stages, queue_size=args.queue_size).run()
+        else:
+            print("[System] Inference Loop Started.")
+            run_sequential(stages)
+
+    except KeyboardInterrupt:
+        print("\n[System] Stopping...")
+    finally:
+        report()
+        if profiler is not None:
+            profiler.dump()
+        if published > 1:
+            elapsed = end_time - start_time
+            print(f"[System] {published} frames published in {elapsed:.1f}s: {(published - 1) / elapsed:.1f} FPS, "
+                  f"capture->publish latency {1000.0 * latency_sum / published:.1f}ms, "
+                  f"{newest_seq - first_seq + 1 - published} source frames not inferred")
+        if reloader is not None:
+            reloader.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if remote is not None:
+            remote.close()
+        if grabber is not None:
+            grabber.stop()
+        else:
+            source.close()
@@ -0,0 +1,297 @@
+import os
+import time
+import queue
+import threading
+from collections import namedtuple
+
+import cv2
+
+# --- CONFIGURATION ---
+PREFETCH = 4          # decoded frames buffered ahead by the file sources
+IMAGE_DIR_FPS = 30.0  # pace of an image directory in real-time mode
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+PACES = ["realtime", "max"]
+
+# seq: frame number in the stream (gaps = frames the source dropped)
+# timestamp: capture time, time.time() so it can be compared across processes and machines
+Frame = namedtuple("Frame", ["seq", "timestamp", "image"])
+
+
+class FrameSource:
+    """
+    Common interface of the frame sources: read() blocks until the next
+    frame and returns a Frame (BGR HWC uint8 of the requested size), or
+    None at the end of the stream. close() releases the device or file.
+    """
+
+    def __init__(self, width, height, mirror=False):
+        self.width = width
+        self.height = height
+        self.mirror = mirror
+        self.seq = -1
+
+    def _fit(self, image):
+        if image.shape[1] != self.width or image.shape[0] != self.height:
+            image = cv2.resize(image, (self.width, self.height))
+        if self.mirror:
+            image = cv2.flip(image, 1)
+        return image
+
+    def read(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class _CameraSource(FrameSource):
+    """
+    Live camera read by a background thread. Each new frame gets the next
+    sequence number and wakes up the reader: read() blocks until a frame
+    newer than the last one it returned is available, so a frame is never
+    processed twice and the caller never spins. Frames arriving while the
+    caller is busy are replaced by newer ones (gaps in seq).
+    """
+
+    def __init__(self, width, height, mirror=False):
+        super().__init__(width, height, mirror)
+        self._latest = None
+        self._ended = False
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._capture, name="camera", daemon=True)
+
+    def _start_capture(self):
+        self._thread.start()
+
+    def _grab(self):
+        """Blocking read of the next camera image, None if the camera is gone"""
+        raise NotImplementedError
+
+    def _capture(self):
+        seq = -1
+        try:
+            while not self._stop.is_set():
+                image = self._grab()
+                if image is None:
+                    break
+                seq += 1
+                frame = Frame(seq, time.time(), self._fit(image))
+                with self._cond:
+                    self._latest = frame
+                    self._cond.notify_all()
+        finally:
+            with self._cond:
+                self._ended = True
+                self._cond.notify_all()
+
+    def read(self):
+        with self._cond:
+            while not self._ended and (self._latest is None or self._latest.seq <= self.seq):
+                self._cond.wait()
+            if self._latest is None or self._latest.seq <= self.seq:
+                return None
+            self.seq = self._latest.seq
+            return self._latest
+
+    def _release(self):
+        pass
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self._release()
+
+
+class CSISource(_CameraSource):
+    """Jetson CSI camera through jetcam (GStreamer)"""
+
+    def __init__(self, width, height, mirror=False, capture_width=1280, capture_height=720, capture_fps=30):
+        super().__init__(width, height, mirror)
+        from jetcam.csi_camera import CSICamera
+        # jetcam's own capture thread (camera.running) is not used, only its GStreamer pipeline
+        self.camera = CSICamera(width=width, height=height, capture_width=capture_width,
+                                capture_height=capture_height, capture_fps=capture_fps)
+        self._start_capture()
+
+    def _grab(self):
+        ret, image = self.camera.cap.read()
+        return image if ret else None
+
+    def _release(self):
+        self.camera.cap.release()
+
+
+class V4L2Source(_CameraSource):
+    """USB webcam (/dev/videoN or its index) through OpenCV's V4L2 backend"""
+
+    def __init__(self, device, width, height, mirror=False):
+        super().__init__(width, height, mirror)
+        if isinstance(device, str) and device.startswith("/dev/video"):
+            device = int(device[len("/dev/video"):])
+        self.cap = cv2.VideoCapture(device, cv2.CAP_V4L2)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"could not open webcam {device}")
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        # Only keep the newest frame in the driver queue
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._start_capture()
+
+    def _grab(self):
+        ret, image = self.cap.read()
+        return image if ret else None
+
+    def _release(self):
+        self.cap.release()
+
+
+class _PrefetchSource(FrameSource):
+    """
+    File-backed source: a thread decodes (and resizes) the frames ahead into
+    a small queue, so decoding overlaps the rest of the server.
+
+    realtime=True plays the stream at its frame rate like a camera: read()
+    waits for the frame's due time, and frames whose time has already passed
+    are dropped (gaps in seq). realtime=False returns every frame as fast as
+    it is consumed, for throughput benchmarks.
+    """
+
+    def __init__(self, width, height, mirror=False, realtime=True, loop=True, prefetch=PREFETCH):
+        super().__init__(width, height, mirror)
+        self.realtime = realtime
+        self.loop = loop
+        self.period = 0.0
+        self._queue = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._start = None
+        self._thread = threading.Thread(target=self._decode, name="decode", daemon=True)
+
+    def _start_decoding(self):
+        self._thread.start()
+
+    def _frames(self):
+        """Yield the decoded images of one pass over the file, in order"""
+        raise NotImplementedError
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _decode(self):
+        index = 0
+        try:
+            while not self._stop.is_set():
+                count = 0
+                for image in self._frames():
+                    if not self._put((index, self._fit(image))):
+                        return
+                    index += 1
+                    count += 1
+                if not self.loop or count == 0:
+                    break
+        finally:
+            self._put(None)
+
+    def read(self):
+        item = self._queue.get()
+        if item is None:
+            self._queue.put(None)  # keep returning None to later calls
+            return None
+        index, image = item
+        if not self.realtime or not self.period:
+            self.seq = index
+            return Frame(index, time.time(), image)
+
+        if self._start is None:
+            self._start = time.monotonic() - index * self.period
+        due = self._start + index * self.period
+        now = time.monotonic()
+        if due > now:
+            time.sleep(due - now)
+        else:
+            # Late: skip to the newest frame that is already due, like a camera would
+            while now >= due + self.period:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                index, image = item
+                due = self._start + index * self.period
+        self.seq = index
+        return Frame(index, time.time(), image)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+
+class VideoFileSource(_PrefetchSource):
+    """Video file decoded by OpenCV, looping by reopening the file at the end"""
+
+    def __init__(self, path, width, height, mirror=False, realtime=True, loop=True, prefetch=PREFETCH):
+        super().__init__(width, height, mirror, realtime, loop, prefetch)
+        self.path = path
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise RuntimeError(f"could not open video file {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        self.period = 1.0 / fps if fps > 0 else 0.0
+        self._start_decoding()
+
+    def _frames(self):
+        cap = cv2.VideoCapture(self.path)
+        try:
+            while True:
+                ret, image = cap.read()
+                if not ret:
+                    return
+                yield image
+        finally:
+            cap.release()
+
+
+class ImageDirSource(_PrefetchSource):
+    """Images of a directory (e.g. data/cible) in name order, played at `fps` in real-time mode"""
+
+    def __init__(self, path, width, height, mirror=False, realtime=True, loop=True, prefetch=PREFETCH, fps=IMAGE_DIR_FPS):
+        super().__init__(width, height, mirror, realtime, loop, prefetch)
+        self.files = sorted(os.path.join(path, f) for f in os.listdir(path)
+                            if f.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.files:
+            raise RuntimeError(f"no image found in {path}")
+        self.period = 1.0 / fps if fps > 0 else 0.0
+        self._start_decoding()
+
+    def _frames(self):
+        for path in self.files:
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+            if image is not None:
+                yield image
+
+
+def open_source(spec, width, height, mirror=False, pace="realtime", loop=True):
+    """
+    Open a source from its command line description:
+      "csi"                -> Jetson CSI camera
+      "0", "/dev/video0"   -> V4L2 webcam
+      directory            -> ImageDirSource
+      anything else        -> VideoFileSource
+    """
+    realtime = pace == "realtime"
+    if spec == "csi":
+        return CSISource(width, height, mirror)
+    if spec.isdigit() or spec.startswith("/dev/video"):
+        return V4L2Source(int(spec) if spec.isdigit() else spec, width, height, mirror)
+    if os.path.isdir(spec):
+        return ImageDirSource(spec, width, height, mirror, realtime, loop)
+    return VideoFileSource(spec, width, height, mirror, realtime, loop)
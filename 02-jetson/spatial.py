@@ -0,0 +1,102 @@
+import numpy as np
+import torch
+
+from backends import TorchBackend
+
+# --- CONFIGURATION ---
+SPATIAL_MODES = ["zones", "columns"]
+
+
+def split_model(model, arch):
+    """
+    Split a classifier (as reshaped by reshape_model / build_model) into its
+    convolutional backbone and the head applied after global average pooling.
+    """
+    if arch.startswith("mobilenet"):
+        return model.features, model.classifier
+    if arch.startswith("resnet"):
+        backbone = torch.nn.Sequential(model.conv1, model.bn1, model.relu, model.maxpool,
+                                       model.layer1, model.layer2, model.layer3, model.layer4)
+        return backbone, model.fc
+    raise ValueError(f"spatial inference not supported for {arch}")
+
+
+def region_weights(regions_x, region_size, frame_width, feature_width):
+    """
+    [R, W] averaging weights over the feature map columns. A region covering
+    part of a column (e.g. x=48 with 32px columns) gets that fraction of it,
+    so each row is the exact average over the region's pixels.
+    """
+    scale = feature_width / frame_width
+    weights = np.zeros((len(regions_x), feature_width), dtype=np.float32)
+    for r, x in enumerate(regions_x):
+        start, end = x * scale, (x + region_size) * scale
+        for c in range(feature_width):
+            weights[r, c] = max(0.0, min(end, c + 1) - max(start, c))
+        weights[r] /= weights[r].sum()
+    return weights
+
+
+class SpatialModel(torch.nn.Module):
+    """
+    Run the backbone once on the whole frame, then the classifier head on
+    the features pooled over each region, instead of running the full model
+    on overlapping crops. Returns logits of shape [B*R, classes] (region
+    major within each frame), like a batch of R crops.
+    Without regions_x there is one region per feature map column.
+    """
+
+    def __init__(self, model, arch, frame_width, frame_height, regions_x=None, region_size=None):
+        super().__init__()
+        self.backbone, self.head = split_model(model, arch)
+        with torch.no_grad():
+            features = self.backbone(torch.zeros(1, 3, frame_height, frame_width))
+        self.feature_shape = tuple(features.shape[1:])
+        if regions_x is None:
+            regions_x, region_size = column_regions(frame_width, self.feature_shape[2])
+        self.regions_x = list(regions_x)
+        self.region_size = region_size
+        weights = region_weights(self.regions_x, region_size, frame_width, self.feature_shape[2])
+        self.register_buffer("weights", torch.from_numpy(weights))
+
+    def forward(self, frames):
+        features = self.backbone(frames)                   # [B, C, h, w]
+        columns = features.mean(dim=2)                     # [B, C, w]
+        regions = torch.matmul(columns, self.weights.t())  # [B, C, R]
+        regions = regions.transpose(1, 2).flatten(0, 1)    # [B*R, C]
+        return self.head(regions)
+
+
+def column_regions(frame_width, feature_width):
+    """One region per feature map column, for a finer target map across the frame"""
+    step = frame_width // feature_width
+    return [c * step for c in range(feature_width)], step
+
+
+class SpatialBackend(TorchBackend):
+    """
+    TorchBackend running a SpatialModel: the input buffer is the whole
+    normalized frame [1,3,H,W] and infer() returns one probability per region.
+    """
+
+    name = "spatial"
+    resizable = False
+
+    def __init__(self, model_path, arch, device, frame_width, frame_height, regions_x=None, region_size=None):
+        self._spatial = (frame_width, frame_height, regions_x, region_size)
+        super().__init__(model_path, arch, device, batch_size=None)
+        self.input_shape = (1, 3, frame_height, frame_width)
+        self.regions_x = self.model.regions_x
+        self.region_size = self.model.region_size
+
+    def _load(self, model_path, arch):
+        model = super()._load(model_path, arch).eval()
+        return SpatialModel(model, arch, *self._spatial)
+
+    def describe(self):
+        return f"{self.name} on {self.device} (backbone once per frame, {len(self.regions_x)} regions)"
+
+    def infer(self, buffer, select=None):
+        if select is not None:
+            raise ValueError("the spatial backend always computes all the regions")
+        return super().infer(buffer)
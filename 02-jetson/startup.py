@@ -0,0 +1,54 @@
+import os
+import time
+from contextlib import contextmanager
+
+
+def process_age():
+    """Seconds since this process was started (interpreter boot included), 0 if unknown (non-Linux)"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime, clock ticks after boot), counted after the "(command)" field
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class StartupTimer:
+    """
+    Timeline of the server startup, in seconds since the process started:
+    phases (start -> end) that may overlap, e.g. the camera opening while
+    the model loads, and events such as the first published result.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter() - process_age()
+        self.entries = []  # (name, start or None for an event, end)
+
+    def now(self):
+        return time.perf_counter() - self.origin
+
+    def add(self, name, start, end):
+        self.entries.append((name, start, end))
+
+    @contextmanager
+    def phase(self, name):
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.add(name, start, self.now())
+
+    def mark(self, name):
+        self.add(name, None, self.now())
+
+    def format(self):
+        lines = []
+        for name, start, end in sorted(self.entries, key=lambda e: e[2] if e[1] is None else e[1]):
+            if start is None:
+                lines.append(f"{name:<34}{'':>15}at {end:6.2f}s")
+            else:
+                lines.append(f"{name:<34}{start:6.2f} -> {end:5.2f}s  {end - start:6.2f}s")
+        return lines
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The 02-jetson modules are imported by name, as the scripts next to them do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from governor import CropRotation
+
+
+def test_rotation_starts_from_the_last_full_frame():
+    rotation = CropRotation(3)
+    full = np.array([0.9, 0.8, 0.7], np.float32)
+    # Governor level 0: every crop inferred, the rotation only seeded
+    assert rotation.select() == [0, 1, 2]
+    rotation.seed(full)
+
+    # First ladder step: the crops not inferred keep their last probability, not 0
+    rotation.every = 2
+    select = rotation.select()
+    probs = rotation.update(select, np.full(len(select), 0.95, np.float32))
+    skipped = [i for i in range(3) if i not in select]
+    assert skipped
+    assert probs[skipped] == pytest.approx(full[skipped])
+    assert probs[select] == pytest.approx(0.95)
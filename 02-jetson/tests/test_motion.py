@@ -0,0 +1,37 @@
+import numpy as np
+
+from motion import MotionGate
+
+WIDTH, HEIGHT = 320, 224
+CROPS_X = [0, 48, 96]
+
+
+def _frame(rng, x=None, size=20):
+    image = np.full((HEIGHT, WIDTH, 3), 100, np.uint8)
+    image += rng.integers(0, 4, image.shape, dtype=np.uint8)  # sensor noise
+    if x is not None:
+        image[100:100 + size, x:x + size] = 250
+    return image
+
+
+def test_small_moving_target_is_inferred():
+    rng = np.random.default_rng(0)
+    gate = MotionGate(CROPS_X, 224, max_age=1000)
+    gate.update(gate.select(_frame(rng, x=20)), [0.0] * 3)
+
+    # A 20px target crossing the frame: every crop it moves in is inferred again
+    for x in range(30, 200, 10):
+        select = gate.select(_frame(rng, x=x))
+        covering = [i for i, cx in enumerate(CROPS_X) if cx <= x and x + 20 <= cx + 224]
+        assert set(covering) <= set(select), (x, select)
+        gate.update(select, [0.0] * len(select))
+
+
+def test_static_noise_is_skipped():
+    rng = np.random.default_rng(0)
+    gate = MotionGate(CROPS_X, 224, max_age=1000)
+    gate.update(gate.select(_frame(rng)), [0.0] * 3)
+    for _ in range(10):
+        select = gate.select(_frame(rng))
+        assert select == []
+        gate.update(select, [])
@@ -0,0 +1,62 @@
+import os
+import time
+
+import numpy as np
+
+import reload
+from backends import HostBatch, Timings
+
+
+class FakeBackend:
+    input_size = None
+
+    def __init__(self, path):
+        self.path = path
+        self.timings = Timings()
+
+    def allocate(self, shape):
+        return HostBatch(shape)
+
+    def warmup(self, shape):
+        pass
+
+    def infer(self, buffer, select=None):
+        return np.full(buffer.array.shape[0], 0.5, np.float32)
+
+
+def _wait(condition, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_watch_follows_the_swapped_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(reload, "WATCH_PERIOD", 0.02)
+    first, second = tmp_path / "a.onnx", tmp_path / "b.onnx"
+    first.write_bytes(b"a")
+    second.write_bytes(b"b")
+    loads = []
+
+    def load(path):
+        loads.append(path)
+        return FakeBackend(path)
+
+    reloader = reload.ModelReloader(load, (3, 3, 8, 8), 3, str(first), watch=True).start()
+    try:
+        assert reloader.reload(str(second))[0]
+        backend = reloader.swap(FakeBackend(str(first)))
+        assert backend.path == str(second)
+        # The new path and its mtime are the reference: no reload of b.onnx by the watcher
+        time.sleep(0.2)
+        assert loads == [str(second)]
+
+        # A change of the file running is reloaded, once
+        stat = os.stat(second)
+        second.write_bytes(b"bb")
+        os.utime(second, (stat.st_atime, stat.st_mtime + 10))
+        assert _wait(lambda: len(loads) == 2)
+        time.sleep(0.2)
+        assert loads == [str(second)] * 2
+    finally:
+        reloader.close()
@@ -0,0 +1,36 @@
+import time
+
+import numpy as np
+import zmq
+
+import wire
+
+
+def _publish(socket, topic, seq):
+    socket.send_multipart([topic] + wire.encode(seq, np.array([0.5], np.float32), [0], 224, 30.0, 0.0))
+
+
+def test_recv_keeps_the_exact_stream():
+    context = zmq.Context()
+    pub = context.socket(zmq.PUB)
+    port = pub.bind_to_random_port("tcp://127.0.0.1")
+    subs = {}
+    for stream in (None, "1"):
+        sub = context.socket(zmq.SUB)
+        sub.connect(f"tcp://127.0.0.1:{port}")
+        wire.subscribe(sub, wire.TOPIC_CONTROL, stream)
+        subs[stream] = sub
+    time.sleep(0.2)  # slow joiner
+
+    # "ctrl" and "ctrl/1" are prefixes of the other stream topics
+    for seq, topic in enumerate([b"ctrl/10", b"ctrl/0", b"ctrl/1", b"ctrl"]):
+        _publish(pub, topic, seq)
+    assert subs[None].poll(2000)
+    assert wire.recv(subs[None])["seq"] == 3
+    assert subs["1"].poll(2000)
+    data = wire.recv(subs["1"], stream=1)
+    assert (data["seq"], data["stream"]) == (2, "1")
+
+    for socket in [pub] + list(subs.values()):
+        socket.close(linger=0)
+    context.term()
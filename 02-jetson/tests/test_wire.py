@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+import wire
+from geometry import zone_probs
+
+
+@pytest.mark.parametrize("encode", [wire.encode, wire.encode_json])
+def test_single_crop_is_every_zone(encode):
+    # 01-vision_server-mobilenet.py: a 224x224 frame used as a single crop at x=0
+    data = wire.decode(encode(1, np.array([0.95], np.float32), [0], 224, 30.0, 0.0))
+    assert data["zones"]["center"] == pytest.approx(0.95)
+    assert data["prob_target"] == pytest.approx(0.95)
+
+
+@pytest.mark.parametrize("encode", [wire.encode, wire.encode_json])
+def test_two_windows_center_takes_both(encode):
+    data = wire.decode(encode(1, np.array([0.1, 0.9], np.float32), [0, 96], 224, 30.0, 0.0))
+    assert data["zones"]["left"] == pytest.approx(0.1)
+    assert data["zones"]["center"] == pytest.approx(0.9)
+    assert data["zones"]["right"] == pytest.approx(0.9)
+    assert data["prob_target"] == pytest.approx(0.9)
+
+
+def test_standard_zones_unchanged():
+    probs = [0.1, 0.2, 0.9]
+    assert zone_probs(probs, [0, 48, 96], 224).tolist() == pytest.approx(probs)
+
+
+def test_heatmap_only_on_request():
+    frames = wire.encode(1, np.array([0.1, 0.2, 0.9], np.float32), [0, 48, 96], 224, 30.0, 0.0)
+    assert "heatmap" not in wire.decode(frames)
+    heatmap = wire.decode(frames, with_heatmap=True)["heatmap"]
+    assert heatmap.shape == (320,)
+    assert heatmap[0] == pytest.approx(0.1) and heatmap[-1] == pytest.approx(0.9)
+    json_frames = wire.encode_json(1, np.array([0.1, 0.2, 0.9], np.float32), [0, 48, 96], 224, 30.0, 0.0)
+    assert b"heatmap" not in json_frames[0]
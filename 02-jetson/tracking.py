@@ -0,0 +1,73 @@
+import numpy as np
+
+# --- CONFIGURATION ---
+TRACK_WINDOWS = 3   # windows inferred around the last target position
+THRESHOLD = 0.6     # below this target probability the tracker falls back to a full scan
+FULL_SCAN_EVERY = 10  # a full scan at least once every N frames
+
+
+class CropScheduler:
+    """
+    Infer only the windows around the last known target position.
+
+    After a full scan where a window reaches the threshold, the next frames
+    only infer the `windows` windows whose centers are nearest to the best
+    one, following the target as it moves. The tracker widens to a full
+    scan when the best tracked probability drops below the threshold, and
+    at least once every full_every frames. The windows not inferred keep
+    their last probability.
+
+        select = scheduler.select()            # indices of the windows to infer
+        probs = scheduler.update(select, out)  # out = probabilities of those windows
+
+    Same interface as MotionGate, so the server runs it the same way.
+    """
+
+    def __init__(self, crops_x, crop_size, windows=TRACK_WINDOWS, threshold=THRESHOLD, full_every=FULL_SCAN_EVERY):
+        self.windows = windows
+        self.threshold = threshold
+        self.full_every = full_every
+        self._centers = np.asarray(crops_x, dtype=np.float32) + crop_size / 2
+
+        self._probs = np.zeros(len(self._centers), dtype=np.float32)
+        self._target = None       # x center of the last window above the threshold
+        self._since_full = 0
+
+        self.frames = 0
+        self.crops = 0
+        self.full_scans = 0
+
+    @property
+    def tracking(self):
+        return self._target is not None
+
+    def select(self, image=None):
+        n = len(self._centers)
+        if self._target is None or self._since_full + 1 >= self.full_every or self.windows >= n:
+            return list(range(n))
+        nearest = np.argsort(np.abs(self._centers - self._target), kind="stable")[:self.windows]
+        return sorted(nearest.tolist())
+
+    def update(self, select, probs):
+        """Store the new probabilities, move the target, and return the probabilities of all the windows"""
+        probs = np.asarray(probs, dtype=np.float32)
+        self._probs[select] = probs
+        if len(select) == len(self._centers):
+            self._since_full = 0
+            self.full_scans += 1
+        else:
+            self._since_full += 1
+
+        best = int(np.argmax(probs))
+        self._target = self._centers[select[best]] if probs[best] >= self.threshold else None
+
+        self.frames += 1
+        self.crops += len(select)
+        return self._probs.copy()
+
+    def mean_crops(self):
+        return self.crops / self.frames if self.frames else 0.0
+
+    def format(self):
+        return (f"{self.mean_crops():.2f}/{len(self._centers)} windows per frame, "
+                f"{self.full_scans}/{self.frames} full scans, {'tracking' if self.tracking else 'searching'}")
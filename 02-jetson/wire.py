@@ -0,0 +1,190 @@
+import json
+import base64
+import struct
+import time
+
+import numpy as np
+import zmq
+
+from geometry import ZONE_SIZE, ZONES_X, heatmap, zone_probs
+
+# --- PROTOCOL ---
+# Binary messages are multipart:
+#   [topic][header][jpeg]     (the jpeg part is only present when FLAG_IMAGE is set)
+# topic is TOPIC_CONTROL (results only, every frame) or TOPIC_PREVIEW (with image, decimated)
+# header = fixed part + N float32 probabilities + N uint16 crop x offsets
+#   magic "VS" | version u8 | flags u8 | seq u32 | capture_ts f64 | publish_ts f64
+#   | fps f32 | crop_size u16 | n_crops u16
+# All fields are little-endian. Bump PROTOCOL_VERSION on any layout change.
+MAGIC = b"VS"
+PROTOCOL_VERSION = 1
+FLAG_IMAGE = 0x01
+
+HEADER = struct.Struct("<2sBBIddfHH")
+
+TOPIC_CONTROL = b"ctrl"
+TOPIC_PREVIEW = b"prev"
+# Prometheus text of the server metrics (--metrics-topic), a single frame after the topic
+TOPIC_METRICS = b"metrics"
+# The multi-stream server publishes stream i on "ctrl/<i>" and "prev/<i>"
+STREAM_SEPARATOR = b"/"
+# Legacy JSON payloads are published without topic, they all start with "{"
+TOPIC_JSON = b"{"
+
+# Names of the crops when the server runs the 3 standard zones
+ZONES = ["left", "center", "right"]
+
+WIRE_FORMATS = ["binary", "json"]
+
+
+def encode(seq, probs, crops_x, crop_size, fps, capture_ts, jpeg=None):
+    """Build the list of frames of a binary message. jpeg (bytes or numpy buffer) is sent as is."""
+    n = len(probs)
+    flags = FLAG_IMAGE if jpeg is not None else 0
+    header = (HEADER.pack(MAGIC, PROTOCOL_VERSION, flags, seq & 0xFFFFFFFF, capture_ts, time.time(), fps, crop_size, n)
+              + np.asarray(probs, dtype="<f4").tobytes()
+              + np.asarray(crops_x, dtype="<u2").tobytes())
+    if jpeg is None:
+        return [header]
+    return [header, jpeg]
+
+
+def encode_json(seq, probs, crops_x, crop_size, fps, capture_ts, jpeg=None):
+    """Legacy single-frame JSON payload (image in base64), for older subscribers"""
+    zones = _zones(probs, crops_x, crop_size)
+    payload = {
+        "seq": seq,
+        "capture_ts": capture_ts,
+        "probs": _probs_map(probs),
+        "zones": zones,
+        "prob_target": zones.get("center", 0.0),
+        "jetson_fps": float(fps),
+    }
+    if jpeg is not None:
+        payload["image_b64"] = base64.b64encode(jpeg).decode('utf-8')
+    return [json.dumps(payload).encode('utf-8')]
+
+
+ENCODERS = {"binary": encode, "json": encode_json}
+
+
+def send(socket, frames):
+    # copy=False: the JPEG buffer is handed to ZMQ without an extra copy
+    socket.send_multipart(frames, copy=False)
+
+
+def _probs_map(probs):
+    if len(probs) == len(ZONES):
+        return {name: float(p) for name, p in zip(ZONES, probs)}
+    return {f"crop{i}": float(p) for i, p in enumerate(probs)}
+
+
+def _zones(probs, crops_x, crop_size):
+    if not len(probs):
+        return {}
+    return dict(zip(ZONES, zone_probs(probs, crops_x, crop_size).tolist()))
+
+
+def _heatmap(probs, crops_x, crop_size):
+    if not len(probs):
+        return np.zeros(0, dtype=np.float32)
+    return heatmap(probs, crops_x, crop_size)
+
+
+def stream_topic(topic, stream=None):
+    """Topic of one stream of a multi-stream server, or the topic itself for a single-stream server"""
+    if stream is None:
+        return topic
+    return topic + STREAM_SEPARATOR + str(stream).encode()
+
+
+def subscribe(socket, topic, stream=None):
+    """
+    Subscribe to a binary topic (of one stream of a multi-stream server) and
+    to the legacy JSON messages, so the client works with both server modes.
+    ZMQ matches prefixes ("ctrl" also receives "ctrl/0"...): recv() with the
+    same stream keeps only the exact topic.
+    """
+    socket.setsockopt(zmq.SUBSCRIBE, stream_topic(topic, stream))
+    socket.setsockopt(zmq.SUBSCRIBE, TOPIC_JSON)
+
+
+def _stream_of(topic):
+    """Stream name of a message topic, None for the single-stream topics and JSON payloads"""
+    if topic[:1] == TOPIC_JSON or STREAM_SEPARATOR not in topic:
+        return None
+    return topic.split(STREAM_SEPARATOR, 1)[1].decode()
+
+
+def decode(frames, with_image=True, with_heatmap=False):
+    """
+    Decode a binary or JSON message into a dict with the same keys as the
+    legacy JSON payload ("probs", "prob_target", "jetson_fps") plus "seq",
+    "capture_ts", "publish_ts", "crops_x", "crop_size" and "jpeg" (raw
+    bytes, or None when absent or with_image=False).
+    "probs" has one entry per window (crop0, crop1... unless there are 3),
+    "zones" always has the left / center / right probabilities and
+    "prob_target" is the center one, "stream" is the stream name with a
+    multi-stream server (None otherwise). with_heatmap=True adds
+    "heatmap", the target probability of each pixel column covered by the
+    windows (numpy array, about 100us per message).
+    """
+    stream = None
+    topic = bytes(frames[0])
+    if topic.split(STREAM_SEPARATOR)[0] in (TOPIC_CONTROL, TOPIC_PREVIEW):
+        frames = frames[1:]
+        stream = _stream_of(topic)
+
+    first = bytes(frames[0])
+    if first[:1] == TOPIC_JSON:
+        data = json.loads(first)
+        image_b64 = data.pop("image_b64", None)
+        data["jpeg"] = base64.b64decode(image_b64) if image_b64 and with_image else None
+        # Payloads of servers older than the "zones" key only had the 3 zones
+        data.setdefault("zones", data["probs"])
+        data["stream"] = None
+        if with_heatmap:
+            # JSON payloads have no offsets: only the 3 standard zones can be placed
+            probs = list(data["probs"].values()) if len(data["probs"]) == len(ZONES) else []
+            data["heatmap"] = _heatmap(probs, ZONES_X, ZONE_SIZE)
+        return data
+
+    magic, version, flags, seq, capture_ts, publish_ts, fps, crop_size, n = HEADER.unpack_from(first)
+    if magic != MAGIC:
+        raise ValueError("not a vision server message")
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"unsupported protocol version {version} (expected {PROTOCOL_VERSION})")
+
+    probs = np.frombuffer(first, dtype="<f4", count=n, offset=HEADER.size)
+    crops_x = np.frombuffer(first, dtype="<u2", count=n, offset=HEADER.size + 4 * n)
+    jpeg = bytes(frames[1]) if with_image and flags & FLAG_IMAGE and len(frames) > 1 else None
+    zones = _zones(probs, crops_x, crop_size)
+    data = {
+        "seq": seq,
+        "capture_ts": capture_ts,
+        "publish_ts": publish_ts,
+        "probs": _probs_map(probs),
+        "zones": zones,
+        "prob_target": zones.get("center", 0.0),
+        "jetson_fps": float(fps),
+        "crops_x": crops_x.tolist(),
+        "crop_size": crop_size,
+        "jpeg": jpeg,
+        "stream": stream,
+    }
+    if with_heatmap:
+        data["heatmap"] = _heatmap(probs, crops_x, crop_size)
+    return data
+
+
+def recv(socket, with_image=True, with_heatmap=False, stream=None):
+    """
+    Blocking receive of the next vision server message (binary or JSON) of
+    `stream`, the one given to subscribe() (None: single-stream server).
+    Messages of the other streams are skipped without being decoded.
+    """
+    stream = None if stream is None else str(stream)
+    while True:
+        frames = socket.recv_multipart()
+        if _stream_of(bytes(frames[0])) == stream:
+            return decode(frames, with_image, with_heatmap)
@@ -0,0 +1,342 @@
+import os
+import time
+import socket
+import struct
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+import zmq
+
+from geometry import parse_layout
+from preprocess import FramePreprocessor
+from publisher import ResultPublisher
+from sources import open_source
+
+# --- CONFIGURATION ---
+TASK_PORT = 5557    # capture node -> workers (PUSH/PULL)
+RESULT_PORT = 5558  # workers -> capture node (PUSH/PULL)
+DEADLINE = 150.0    # ms after submission before a frame is given up
+WORKER_TIMEOUT = 5.0  # seconds without result before a worker is reported as gone
+TASKS_PER_WORKER = 2  # tasks in flight per active worker (one running, one waiting)
+REPORT_EVERY = 5.0
+FPS_WINDOW = 1.0
+
+# --- PROTOCOL ---
+# task   = [header][crops]   header: task id u32 | n u16 | c u16 | h u16 | w u16, crops: float32 [n,c,h,w]
+# result = [header][worker]  header: task id u32 | n u16 + n float32 probabilities, worker: name (utf-8)
+TASK = struct.Struct("<IHHHH")
+RESULT = struct.Struct("<IH")
+
+
+def encode_task(task_id, crops):
+    return [TASK.pack(task_id & 0xFFFFFFFF, *crops.shape), crops]
+
+
+def decode_task(frames):
+    task_id, n, c, h, w = TASK.unpack(frames[0])
+    return task_id, np.frombuffer(frames[1], dtype=np.float32).reshape(n, c, h, w)
+
+
+def encode_result(task_id, probs, name):
+    probs = np.asarray(probs, dtype="<f4")
+    return [RESULT.pack(task_id, len(probs)) + probs.tobytes(), name.encode()]
+
+
+def decode_result(frames):
+    task_id, n = RESULT.unpack_from(frames[0])
+    probs = np.frombuffer(frames[0], dtype="<f4", count=n, offset=RESULT.size).copy()
+    return task_id, probs, bytes(frames[1]).decode()
+
+
+class ReorderBuffer:
+    """
+    Frames in submission order, each waiting for its result until its
+    deadline. pop_ready() releases the frames from the oldest one: a frame
+    is released once resolved, or as expired once its deadline has passed,
+    so the results always come out in frame order and a lost result never
+    blocks the frames behind it for more than the deadline.
+    """
+
+    def __init__(self, deadline_ms):
+        self.deadline = deadline_ms / 1000.0
+        self._frames = OrderedDict()  # task id -> [deadline, meta, probs]
+        self._lock = threading.Lock()
+
+    def add(self, task_id, meta, probs=None):
+        with self._lock:
+            self._frames[task_id] = [time.monotonic() + self.deadline, meta, probs]
+
+    def resolve(self, task_id, probs):
+        """Store the result of a frame and return its meta, None if it was already released (late result)"""
+        with self._lock:
+            entry = self._frames.get(task_id)
+            if entry is None:
+                return None
+            entry[2] = probs
+            return entry[1]
+
+    def unresolved(self):
+        with self._lock:
+            return sum(probs is None for _, _, probs in self._frames.values())
+
+    def discard(self, task_id):
+        with self._lock:
+            self._frames.pop(task_id, None)
+
+    def pop_ready(self):
+        """[(task id, meta, probs, expired)] of the frames that can be released, in order"""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            while self._frames:
+                task_id, (deadline, meta, probs) = next(iter(self._frames.items()))
+                if probs is None and now < deadline:
+                    break
+                del self._frames[task_id]
+                ready.append((task_id, meta, probs, probs is None))
+        return ready
+
+    def __len__(self):
+        return len(self._frames)
+
+
+class WorkerPool:
+    """
+    Inference on a pool of worker processes (05-inference_worker.py), local
+    or on other hosts. The pool binds a PUSH socket for the tasks and a PULL
+    socket for the results, the workers connect to both: ZMQ hands each task
+    to the next worker with room in its queue (one task at a time), so
+    workers can join or leave at any time. The socket buffers could still
+    hold several tasks, so the tasks in flight are also limited to
+    TASKS_PER_WORKER per active worker: beyond that (or without any worker)
+    a task is refused instead of queued. A task whose result does not come
+    back within the deadline (slow or departed worker) expires.
+
+        pool.submit(meta, crops)           # False if no worker is available
+        for meta, probs, expired in pool.poll(10): ...
+    """
+
+    def __init__(self, context, task_port=TASK_PORT, result_port=RESULT_PORT, deadline_ms=DEADLINE):
+        self.tasks = context.socket(zmq.PUSH)
+        self.tasks.setsockopt(zmq.SNDHWM, 1)
+        self.tasks.setsockopt(zmq.LINGER, 0)
+        self.tasks.bind(f"tcp://*:{task_port}")
+        self.results = context.socket(zmq.PULL)
+        self.results.setsockopt(zmq.LINGER, 0)
+        self.results.bind(f"tcp://*:{result_port}")
+
+        self.pending = ReorderBuffer(deadline_ms)
+        self._next_id = 0
+        self.submitted = 0
+        self.refused = 0
+        self.completed = 0
+        self.expired = 0
+        self.late = 0
+        self.round_trips = deque(maxlen=500)
+        self.workers = {}  # name -> [results, last seen]
+
+    def has_capacity(self):
+        """True when a new task would not wait behind the ones in flight"""
+        limit = max(1, TASKS_PER_WORKER * len(self.active_workers()))
+        return self.pending.unresolved() < limit
+
+    def submit(self, meta, crops, local_probs=None):
+        """
+        Send the [n,c,h,w] crops of a frame to the next free worker. local_probs
+        (if any) is stored with the frame, e.g. as a fallback answer.
+        Returns False when no worker can take the task right now.
+        """
+        if not self.has_capacity():
+            self.refused += 1
+            return False
+        task_id = self._next_id
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        self.pending.add(task_id, (meta, time.monotonic(), local_probs))
+        try:
+            self.tasks.send_multipart(encode_task(task_id, crops), flags=zmq.NOBLOCK)
+        except zmq.Again:
+            self.pending.discard(task_id)
+            self.refused += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def add_resolved(self, meta, probs):
+        """Frame answered without the workers, released in order with the others"""
+        task_id = self._next_id
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        self.pending.add(task_id, (meta, time.monotonic(), probs), probs)
+
+    def poll(self, timeout_ms=10):
+        """Receive the results, then return [(meta, probs, expired)] of the released frames in order"""
+        while self.results.poll(timeout_ms):
+            task_id, probs, name = decode_result(self.results.recv_multipart())
+            stats = self.workers.setdefault(name, [0, 0.0])
+            stats[0] += 1
+            stats[1] = time.monotonic()
+            entry = self.pending.resolve(task_id, probs)
+            if entry is None:
+                self.late += 1
+            else:
+                self.completed += 1
+                self.round_trips.append(time.monotonic() - entry[1])
+            timeout_ms = 0
+        released = []
+        for _, (meta, _, local_probs), probs, expired in self.pending.pop_ready():
+            if expired:
+                self.expired += 1
+                released.append((meta, local_probs, True))
+            else:
+                released.append((meta, probs, False))
+        return released
+
+    def active_workers(self):
+        now = time.monotonic()
+        return {name: n for name, (n, seen) in list(self.workers.items()) if now - seen < WORKER_TIMEOUT}
+
+    def format(self):
+        rtt = 1000.0 * np.asarray(self.round_trips or [0.0])
+        workers = ", ".join(f"{name} n={n}" for name, n in self.active_workers().items()) or "none"
+        return (f"{self.completed}/{self.submitted} tasks done, {self.expired} past the deadline, "
+                f"{self.refused} refused (no free worker), {self.late} late results | "
+                f"round trip p50 {np.percentile(rtt, 50):.1f}ms p95 {np.percentile(rtt, 95):.1f}ms | workers: {workers}")
+
+    def close(self):
+        self.tasks.close()
+        self.results.close()
+
+
+def serve(backend, host, task_port=TASK_PORT, result_port=RESULT_PORT, name=None, tasks_limit=0, warmup_shape=None):
+    """
+    Worker loop: pull tasks from the capture node at host, infer them, push
+    the results back. The backend is warmed up at warmup_shape before
+    joining the pool, and at any other task shape when it first comes.
+    """
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    buffers = {}
+    if warmup_shape is not None:
+        backend.warmup(warmup_shape)
+        buffers[tuple(warmup_shape)] = backend.allocate(warmup_shape)
+    context = zmq.Context()
+    tasks = context.socket(zmq.PULL)
+    # One task at a time: the next one goes to a free worker instead of waiting here
+    tasks.setsockopt(zmq.RCVHWM, 1)
+    tasks.setsockopt(zmq.LINGER, 0)
+    tasks.connect(f"tcp://{host}:{task_port}")
+    results = context.socket(zmq.PUSH)
+    results.setsockopt(zmq.LINGER, 0)
+    results.connect(f"tcp://{host}:{result_port}")
+    print(f"[Worker] {name} connected to {host}:{task_port}/{result_port}")
+
+    done = 0
+    try:
+        while not tasks_limit or done < tasks_limit:
+            task_id, crops = decode_task(tasks.recv_multipart())
+            buffer = buffers.get(crops.shape)
+            if buffer is None:
+                backend.warmup(crops.shape)
+                buffer = buffers[crops.shape] = backend.allocate(crops.shape)
+            buffer.array[:] = crops
+            results.send_multipart(encode_result(task_id, backend.infer(buffer), name))
+            done += 1
+            if done % 100 == 0:
+                print(f"[Worker] {done} tasks | {backend.name}: {backend.timings.format()}")
+    except KeyboardInterrupt:
+        print(f"\n[Worker] {name} leaving after {done} tasks")
+    finally:
+        tasks.close()
+        results.close()
+        context.term()
+
+
+def run(args):
+    """
+    Capture node: read and preprocess the frames, send them to the worker
+    pool, and publish the results in frame order. Frames past the deadline
+    are dropped, like frames nobody could take.
+    """
+    crops_x = parse_layout(args.crops, args.windows, args.stride, args.width, args.crop_size)
+    print(f"[Init] {len(crops_x)} crops of {args.crop_size}px at x={crops_x}")
+    context = zmq.Context()
+    publisher = ResultPublisher(context, args.port, crops_x, args.crop_size, args.wire,
+                                args.preview_fps, args.preview_scale, args.preview_quality)
+    print(f"[Comms] ZMQ Publisher bound to port {args.port}")
+    pool = WorkerPool(context, args.task_port, args.result_port, args.deadline)
+    print(f"[Comms] Tasks on port {args.task_port}, results on port {args.result_port}, deadline {args.deadline:.0f}ms")
+
+    print(f"[Camera] Opening {args.input} ({args.pace})...")
+    try:
+        source = open_source(args.input, args.width, args.height, args.mirror, args.pace)
+    except Exception as e:
+        print(f"[Error] Could not open video source: {e}")
+        pool.close()
+        publisher.close()
+        return
+    preprocess = FramePreprocessor(crops_x, args.crop_size, args.width, args.height, bgr=True)
+
+    stop = threading.Event()
+    published = 0
+    latency_sum = 0.0
+    start_time = end_time = None
+    times = deque()
+
+    # --- RESULTS (own thread: result socket, reorder buffer and publisher) ---
+    def receive():
+        nonlocal published, latency_sum, start_time, end_time
+        while not stop.is_set():
+            for (seq, timestamp, image), probs, expired in pool.poll(10):
+                if expired:
+                    continue
+                now = time.time()
+                times.append(now)
+                while now - times[0] > FPS_WINDOW:
+                    times.popleft()
+                span = now - times[0]
+                fps = (len(times) - 1) / span if span > 0 else 0.0
+                publisher.send_control(seq, probs, fps, timestamp)
+                if publisher.preview_due():
+                    publisher.send_preview(seq, probs, fps, timestamp, publisher.encode_preview(image))
+
+                if start_time is None:
+                    start_time = now
+                end_time = time.time()
+                published += 1
+                latency_sum += end_time - timestamp
+                if args.frames and published >= args.frames:
+                    stop.set()
+
+    receiver = threading.Thread(target=receive, daemon=True)
+    receiver.start()
+    print("[System] Waiting for workers (05-inference_worker.py)...")
+    next_report = time.monotonic() + REPORT_EVERY
+    try:
+        while not stop.is_set():
+            frame = source.read()
+            if frame is None:
+                break
+            if args.pace == 'max':
+                # Files read as fast as the workers go: wait for a free one instead of dropping
+                while not pool.has_capacity() and not stop.is_set():
+                    time.sleep(0.001)
+            pool.submit((frame.seq, frame.timestamp, frame.image), preprocess(frame.image))
+            if time.monotonic() >= next_report:
+                print(f"[Pool] {pool.format()}")
+                next_report += REPORT_EVERY
+        # Let the last frames come back or expire
+        deadline = time.monotonic() + 2 * pool.pending.deadline
+        while len(pool.pending) and time.monotonic() < deadline and not stop.is_set():
+            time.sleep(0.01)
+    except KeyboardInterrupt:
+        print("\n[System] Stopping...")
+    finally:
+        stop.set()
+        receiver.join(timeout=1.0)
+        print(f"[Pool] {pool.format()}")
+        if published > 1:
+            elapsed = end_time - start_time
+            print(f"[System] {published} frames published in {elapsed:.1f}s: {(published - 1) / elapsed:.1f} FPS, "
+                  f"capture->publish latency {1000.0 * latency_sum / published:.1f}ms")
+        source.close()
+        pool.close()
+        publisher.close()